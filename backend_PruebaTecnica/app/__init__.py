@@ -1,24 +1,43 @@
+import os
+from typing import Dict, Optional
+
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
-from .config import config
+from .config import INSTANCE_FILES, config
+from .compression import Compress
+from .structured_logging import log_pipeline
 
 db = SQLAlchemy()
 migrate = Migrate()
+compress = Compress()
 
-def create_app(config_name='default'):
+def create_app(config_name='default', overrides: Optional[Dict] = None):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    # Valores explícitos (pruebas, procesos hijos) por encima de los leídos del entorno
+    app.config.update(overrides or {})
+    app.config['CONFIG_NAME'] = config_name
+    for key, name in INSTANCE_FILES.items():
+        if app.config.get(key) is None:
+            app.config[key] = os.path.join(app.instance_path, name)
+    log_pipeline.init_app(app)
 
     db.init_app(app)
     migrate.init_app(app, db)
     CORS(app)
+    compress.init_app(app)
 
     # Registrar blueprints
-    from app.api import api as api_blueprint  # Importar el blueprint
+    from app.api.routers import api as api_blueprint  # Importar el blueprint
     app.register_blueprint(api_blueprint, url_prefix='/api/v1')
 
+    # Snapshot de Stack Exchange guardado en disco para arranques en caliente
+    from app.api.routers import stack_service
+    stack_service.init_app(app)
+
     @app.cli.command("seed-db")
     def seed_db():
         """Cargar datos iniciales"""
@@ -26,4 +45,62 @@ def create_app(config_name='default'):
         seed_data()
         print("Datos cargados exitosamente!")
 
+    @app.cli.command("rebuild-sketches")
+    def rebuild_sketches():
+        """Reconstruir los resúmenes para analytics aproximados"""
+        from app.services.flight_sketches import SketchConflictError, flight_sketches
+        try:
+            total = flight_sketches.rebuild()
+        except SketchConflictError as e:
+            raise click.ClickException(str(e))
+        print(f"Resúmenes reconstruidos con {total} vuelos")
+
+    @app.cli.command("analyze-file")
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--workers', type=int, default=None, help='Procesos a usar (por defecto, uno por CPU)')
+    @click.option('--check', is_flag=True, help='Comparar con los analytics SQL de la base configurada')
+    def analyze_file_command(path, workers, check):
+        """Analytics de vuelos directamente desde un CSV (id_aerolinea, id_aeropuerto, dia)"""
+        import json
+        import time
+        from concurrent.futures.process import BrokenProcessPool
+        from sqlalchemy.exc import SQLAlchemyError
+        from app.models import Airline, Airport
+        from app.services import flight_analytics
+        from app.services.file_analytics import FileAnalyticsError, analyze_file, compare_with_sql
+
+        started = time.perf_counter()
+        try:
+            aggregates = analyze_file(path, workers)
+        except FileAnalyticsError as e:
+            raise click.ClickException(str(e))
+        except BrokenProcessPool:
+            raise click.ClickException("Un proceso del análisis terminó inesperadamente "
+                                       "(p. ej. por falta de memoria); pruebe con menos --workers")
+        except OSError as e:
+            raise click.ClickException(f"No se pudo leer el archivo: {e}")
+        elapsed = time.perf_counter() - started
+
+        # Los nombres salen de los catálogos si hay base; si no, se muestran los ids
+        try:
+            airline_names = dict(db.session.query(Airline.id_aerolinea, Airline.nombre_aerolinea).all())
+            airport_names = dict(db.session.query(Airport.id_aeropuerto, Airport.nombre_aeropuerto).all())
+        except SQLAlchemyError:
+            if check:
+                raise click.ClickException("--check necesita una base de datos configurada")
+            airline_names, airport_names = {}, {}
+
+        results = aggregates.results(airline_names, airport_names)
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        print(f"{aggregates.rows} vuelos ({aggregates.skipped} líneas omitidas) en {elapsed:.2f} s")
+
+        if check:
+            differences = compare_with_sql(aggregates, results, flight_analytics.get_analytics_snapshot(),
+                                           airline_names, airport_names)
+            if differences:
+                for difference in differences:
+                    print(f"  - {difference}")
+                raise click.ClickException(f"{len(differences)} diferencias con los analytics SQL")
+            print("Paridad con los analytics SQL: OK")
+
     return app
\ No newline at end of file
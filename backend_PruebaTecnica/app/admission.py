@@ -0,0 +1,143 @@
+# app/admission.py
+
+import contextvars
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, FrozenSet, Iterable, Iterator
+
+from flask import Response, current_app, jsonify
+
+# Grupos cuyo cupo ya tomó la petición en curso (p. ej. un batch para sus sub-peticiones)
+_held_groups: contextvars.ContextVar[FrozenSet[str]] = contextvars.ContextVar('admission_held', default=frozenset())
+
+
+class AdmissionRejected(Exception):
+    """No hay cupo en un grupo de rutas"""
+
+    def __init__(self, limiter: 'RouteLimiter'):
+        super().__init__(limiter.name)
+        self.limiter = limiter
+
+
+class RouteLimiter:
+    """
+    Límite de concurrencia para un grupo de rutas con una cola de espera acotada.
+    Si la cola está llena, o la espera supera el timeout, la petición se rechaza.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int,
+                 queue_timeout: float, retry_after: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._active = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> bool:
+        with self._cond:
+            if self._active < self.max_concurrent:
+                self._active += 1
+                return True
+            if self._waiting >= self.max_queue:
+                return False
+            self._waiting += 1
+            try:
+                admitted = self._cond.wait_for(
+                    lambda: self._active < self.max_concurrent,
+                    timeout=self.queue_timeout
+                )
+                if admitted:
+                    self._active += 1
+                return admitted
+            finally:
+                self._waiting -= 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, int]:
+        return {'active': self._active, 'waiting': self._waiting}
+
+
+class AdmissionControl:
+    """Registro de limitadores por grupo de rutas, configurados con ADMISSION_LIMITS"""
+
+    def __init__(self):
+        self._limiters: Dict[str, RouteLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get_limiter(self, group: str) -> RouteLimiter:
+        limiter = self._limiters.get(group)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(group)
+                if limiter is None:
+                    settings = current_app.config['ADMISSION_LIMITS'][group]
+                    limiter = RouteLimiter(group, **settings)
+                    self._limiters[group] = limiter
+        return limiter
+
+    @staticmethod
+    def rejected_response(limiter: RouteLimiter) -> Response:
+        """Respuesta 503 con Retry-After para una petición sin cupo"""
+        current_app.logger.warning("Petición rechazada por sobrecarga en '%s'", limiter.name,
+                                   extra={'event': 'admission.shed', 'group': limiter.name})
+        response = jsonify({
+            'status': 'error',
+            'message': 'Servicio saturado, intente más tarde'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(limiter.retry_after)
+        return response
+
+    @contextmanager
+    def hold(self, groups: Iterable[str]) -> Iterator[None]:
+        """
+        Toma un cupo de cada grupo para todo el bloque; las vistas de esos grupos
+        que corran dentro (también en hilos con el contexto copiado) no piden otro.
+        Lanza AdmissionRejected si algún grupo no tiene cupo.
+        """
+        held = []
+        try:
+            # Orden fijo para que dos batches no se bloqueen tomando grupos cruzados
+            for group in sorted(set(groups) - _held_groups.get()):
+                limiter = self.get_limiter(group)
+                if not limiter.acquire():
+                    raise AdmissionRejected(limiter)
+                held.append(limiter)
+            token = _held_groups.set(_held_groups.get() | {limiter.name for limiter in held})
+            try:
+                yield
+            finally:
+                _held_groups.reset(token)
+        finally:
+            for limiter in held:
+                limiter.release()
+
+    def limit(self, group: str):
+        """Decorador que aplica el límite del grupo a una vista; responde 503 si hay sobrecarga"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if group in _held_groups.get():
+                    return view(*args, **kwargs)
+                limiter = self.get_limiter(group)
+                if not limiter.acquire():
+                    return self.rejected_response(limiter)
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    limiter.release()
+            # Grupo de la vista, para que un batch sepa qué cupos tomar
+            wrapper.admission_group = group
+            return wrapper
+        return decorator
+
+
+admission = AdmissionControl()
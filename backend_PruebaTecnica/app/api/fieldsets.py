@@ -0,0 +1,111 @@
+# app/api/fieldsets.py
+
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, select
+
+from app import db
+
+
+class FieldsetError(ValueError):
+    """Error en el parámetro ?fields= de una petición"""
+    pass
+
+
+class PaginationError(FieldsetError):
+    """Error en los parámetros ?limit= / ?after_id= de una petición paginada"""
+    pass
+
+
+def parse_fields(model, raw: Optional[str]) -> List[Column]:
+    """
+    Convierte ?fields=a,b en columnas del modelo, validando que existan.
+    Sin el parámetro se devuelven todas las columnas de la tabla.
+    """
+    columns = model.__table__.columns
+    if raw is None or not raw.strip():
+        return list(columns)
+
+    selected = []
+    for name in (field.strip() for field in raw.split(',')):
+        if not name:
+            continue
+        if name not in columns:
+            allowed = ', '.join(columns.keys())
+            raise FieldsetError(f"Campo inválido '{name}'. Campos permitidos: {allowed}")
+        if columns[name] not in selected:
+            selected.append(columns[name])
+    if not selected:
+        raise FieldsetError("El parámetro 'fields' no contiene campos")
+    return selected
+
+
+def _serialize(value):
+    # Mismo formato de fecha que los to_dict() de los modelos
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def select_fields(columns: List[Column]) -> List[Dict]:
+    """
+    Ejecuta un SELECT solo de las columnas pedidas, sin hidratar entidades ORM,
+    y devuelve una lista de diccionarios lista para jsonify.
+    """
+    names = [column.key for column in columns]
+    rows = db.session.execute(select(*columns)).all()
+    return [
+        {name: _serialize(value) for name, value in zip(names, row)}
+        for row in rows
+    ]
+
+
+def _parse_int(value: str) -> Optional[int]:
+    # int() con try y no isdigit(): isdigit() acepta '²', que int() rechaza
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def parse_page(args: Dict[str, str], default_size: int, max_size: int) -> Tuple[int, Optional[int]]:
+    """Tamaño de página (?limit=, entre 1 y max_size) y último id ya recibido (?after_id=)"""
+    raw_limit = args.get('limit')
+    if raw_limit is None:
+        limit = min(default_size, max_size)
+    else:
+        limit = _parse_int(raw_limit)
+        if limit is None or not 1 <= limit <= max_size:
+            raise PaginationError(f"'limit' debe ser un entero entre 1 y {max_size}")
+    raw_after = args.get('after_id')
+    if raw_after is None:
+        return limit, None
+    after = _parse_int(raw_after)
+    if after is None or after < 0:
+        raise PaginationError("'after_id' debe ser un entero no negativo")
+    return limit, after
+
+
+def select_page(columns: List[Column], key: Column, limit: int,
+                after: Optional[int] = None) -> Tuple[List[Dict], Optional[int]]:
+    """
+    Página por keyset: WHERE key > after ORDER BY key LIMIT limit, que usa el
+    índice de la clave y cuesta lo mismo en cualquier punto de la tabla.
+    Devuelve las filas y el `after_id` de la página siguiente (None si es la última).
+    """
+    names = [column.key for column in columns]
+    # La clave se lee aunque no se haya pedido en ?fields= para armar el cursor
+    extra = [] if key in columns else [key]
+    query = select(*columns, *extra).order_by(key).limit(limit + 1)
+    if after is not None:
+        query = query.where(key > after)
+    rows = db.session.execute(query).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    key_index = len(columns) if extra else columns.index(key)
+    next_after = rows[-1][key_index] if has_more else None
+    return [
+        {name: _serialize(value) for name, value in zip(names, row)}
+        for row in rows
+    ], next_after
@@ -1,4 +1,8 @@
-from flask import Blueprint, jsonify
+import queue
+from functools import wraps
+from typing import Dict, Optional
+
+from flask import Blueprint, Response, current_app, jsonify, request
 from app.models import Airline, Airport, Movement, Flight
 from ..services.stackoverflow_service import (
     StackOverflowService, 
@@ -6,107 +10,241 @@ from ..services.stackoverflow_service import (
     ValidationError, 
     ServiceError
 )
+from ..services import flight_analytics
+from ..services.flight_filters import FilterError, build_filters, parse_int
+from ..services.flight_matrix import get_flight_matrix, parse_dims
+from ..services.flight_timeseries import get_flight_timeseries, timeseries_bounds
+from ..services.flight_sketches import SketchConflictError, flight_sketches
+from ..services.analytics_stream import analytics_broadcaster, data_version, format_sse
+from ..compression import PayloadCache
+from ..admission import AdmissionRejected, admission
+from ..services.batch_service import BatchExecutor, BatchRequestError
+from ..services.jobs import JobError, job_manager
+from .fieldsets import FieldsetError, parse_fields, parse_page, select_fields, select_page
 
 from app import db
 from sqlalchemy import func
 
 api = Blueprint('api', __name__)
 stack_service = StackOverflowService()
+# Respuestas de analytics serializadas y comprimidas, invalidadas al cambiar los vuelos
+analytics_cache = PayloadCache()
 
 # Rutas básicas
+def list_fields(model, key=None):
+    """
+    Lista de registros con solo las columnas pedidas en ?fields=.
+    Con `key` se pagina por esa columna (?limit=&after_id=) y el cursor de la
+    página siguiente va en el encabezado X-Next-After-Id.
+    """
+    try:
+        columns = parse_fields(model, request.args.get('fields'))
+        if key is not None:
+            limit, after = parse_page(request.args, current_app.config['FLIGHTS_PAGE_SIZE'],
+                                      current_app.config['FLIGHTS_MAX_PAGE_SIZE'])
+    except FieldsetError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    if key is None:
+        return jsonify(select_fields(columns))
+    rows, next_after = select_page(columns, key, limit, after)
+    response = jsonify(rows)
+    if next_after is not None:
+        response.headers['X-Next-After-Id'] = str(next_after)
+    return response
+
 @api.route('/airlines', methods=['GET'])
 def get_airlines():
-    airlines = Airline.query.all()
-    result = [{
-        'id_aerolinea': airline.id_aerolinea,
-        'nombre_aerolinea': airline.nombre_aerolinea
-    } for airline in airlines]
-    return jsonify(result)
+    return list_fields(Airline)
 
 @api.route('/airports', methods=['GET'])
 def get_airports():
-    airports = Airport.query.all()
-    result = [{
-        'id_aeropuerto': airport.id_aeropuerto,
-        'nombre_aeropuerto': airport.nombre_aeropuerto
-    } for airport in airports]
-    return jsonify(result)
+    return list_fields(Airport)
 
 @api.route('/movements', methods=['GET'])
 def get_movements():
-    movements = Movement.query.all()
-    result = [{
-        'id_movimiento': movement.id_movimiento,
-        'descripcion': movement.descripcion
-    } for movement in movements]
-    return jsonify(result)
+    return list_fields(Movement)
+
+@api.route('/flights', methods=['GET'])
+def get_flights():
+    return list_fields(Flight, key=Flight.id)
 
 # Rutas analíticas
+def wants_approx() -> bool:
+    """?approx=true responde con los resúmenes probabilísticos en lugar del GROUP BY exacto"""
+    if request.args.get('approx', 'false').lower() not in ('true', '1', 'yes'):
+        return False
+    # Sin estado construido con `flask rebuild-sketches` se responde con el valor exacto;
+    # con varios procesos escribiendo vuelos is_ready() lanza SketchConflictError (409)
+    return flight_sketches.is_ready()
+
+@api.errorhandler(SketchConflictError)
+def handle_sketch_conflict(e):
+    return jsonify({
+        'status': 'error',
+        'message': str(e)
+    }), 409
+
+def approx_version():
+    """Versión del cache en rutas con ?approx: cambia también cuando se carga el estado de los resúmenes"""
+    return (data_version.value, wants_approx())
+
 @api.route('/analytics/busiest-airport', methods=['GET'])
+@analytics_cache.cached(version=approx_version)
+@admission.limit('analytics')
 def get_busiest_airport():
     """Aeropuerto que ha tenido mayor movimiento durante el año"""
-    result = db.session.query(
-        Airport.nombre_aeropuerto,
-        db.func.count(Flight.id).label('total_movements')
-    ).join(Flight).group_by(Airport.id_aeropuerto, Airport.nombre_aeropuerto)\
-    .order_by(db.func.count(Flight.id).desc()).first()
-    
-    return jsonify({
-        'airport': result[0] if result else None,
-        'total_movements': result[1] if result else 0
-    })
+    if wants_approx():
+        return jsonify(flight_sketches.busiest_airport())
+    return jsonify(flight_analytics.get_busiest_airport())
 
 @api.route('/analytics/most-active-airline', methods=['GET'])
+@analytics_cache.cached(version=approx_version)
+@admission.limit('analytics')
 def get_most_active_airline():
     """Aerolínea con mayor número de vuelos"""
-    result = db.session.query(
-        Airline.nombre_aerolinea,
-        db.func.count(Flight.id).label('total_flights')
-    ).join(Flight).group_by(Airline.id_aerolinea, Airline.nombre_aerolinea)\
-    .order_by(db.func.count(Flight.id).desc()).first()
-    
-    return jsonify({
-        'airline': result[0] if result else None,
-        'total_flights': result[1] if result else 0
-    })
+    if wants_approx():
+        return jsonify(flight_sketches.most_active_airline())
+    return jsonify(flight_analytics.get_most_active_airline())
 
 @api.route('/analytics/busiest-day', methods=['GET'])
+@analytics_cache.cached(version=approx_version)
+@admission.limit('analytics')
 def get_busiest_day():
     """Día con mayor número de vuelos"""
-    result = db.session.query(
-        Flight.dia,
-        db.func.count(Flight.id).label('total_flights')
-    ).group_by(Flight.dia)\
-    .order_by(db.func.count(Flight.id).desc()).first()
-    
-    return jsonify({
-        'date': result[0].strftime('%Y-%m-%d') if result else None,
-        'total_flights': result[1] if result else 0
-    })
+    if wants_approx():
+        return jsonify(flight_sketches.busiest_day())
+    return jsonify(flight_analytics.get_busiest_day())
 
 @api.route('/analytics/airlines-multiple-daily', methods=['GET'])
+@analytics_cache.cached(version=lambda: data_version.value)
+@admission.limit('analytics')
 def get_airlines_multiple_daily():
     """Aerolíneas con más de 2 vuelos por día"""
-    result = db.session.query(
-        Airline.nombre_aerolinea,
-        Flight.dia,
-        db.func.count(Flight.id).label('flights_per_day')
-    ).join(Airline)\
-    .group_by(Airline.nombre_aerolinea, Flight.dia)\
-    .having(db.func.count(Flight.id) > 2).all()
-    
-    return jsonify([{
-        'airline': r[0],
-        'date': r[1].strftime('%Y-%m-%d'),
-        'flights': r[2]
-    } for r in result])
+    return jsonify(flight_analytics.get_airlines_multiple_daily())
+
+@api.route('/analytics/airline-active-days', methods=['GET'])
+@analytics_cache.cached(version=approx_version)
+@admission.limit('analytics')
+def get_airline_active_days():
+    """Días distintos con vuelos por aerolínea"""
+    if wants_approx():
+        return jsonify(flight_sketches.airline_active_days())
+    return jsonify(flight_analytics.get_airline_active_days())
+
+@api.route('/analytics/matrix', methods=['GET'])
+@analytics_cache.cached(version=lambda: data_version.value)
+@admission.limit('analytics')
+def get_flight_matrix_view():
+    """Conteo de vuelos por aerolínea × aeropuerto × día (o movimiento) en un solo pivot"""
+    try:
+        return jsonify(get_flight_matrix(
+            parse_dims(request.args.get('dims')),
+            build_filters(request.args),
+            layout=request.args.get('format', 'dense'),
+            max_dense_cells=current_app.config['MATRIX_MAX_DENSE_CELLS']
+        ))
+    except FilterError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+
+@api.route('/analytics/timeseries', methods=['GET'])
+@analytics_cache.cached(version=lambda: data_version.value)
+@admission.limit('analytics')
+def get_flight_timeseries_view():
+    """Vuelos por día, semana o mes para cada aerolínea o aeropuerto, listos para graficar"""
+    limit = current_app.config['TIMESERIES_MAX_POINTS']
+    try:
+        max_points = parse_int('max_points', request.args.get('max_points', str(limit)), 1, limit)
+        first, last = timeseries_bounds(request.args, current_app.config['TIMESERIES_MAX_BUCKETS'])
+        return jsonify(get_flight_timeseries(
+            request.args.get('group', 'airline'),
+            request.args.get('interval', 'day'),
+            build_filters(request.args),
+            max_points,
+            first=first,
+            last=last
+        ))
+    except FilterError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+
+@api.route('/analytics/stream', methods=['GET'])
+def stream_analytics():
+    """Stream SSE con los analytics de vuelos; solo emite cuando cambian los datos"""
+    keepalive = current_app.config['ANALYTICS_STREAM_KEEPALIVE']
+    subscriber = analytics_broadcaster.subscribe(current_app._get_current_object())
+
+    def generate():
+        try:
+            while True:
+                try:
+                    version, payload = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    # Comentario SSE para mantener viva la conexión
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(payload, event_name='analytics', event_id=version)
+        finally:
+            analytics_broadcaster.unsubscribe(subscriber)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 # Nuevas rutas para Stack Exchange
+@api.before_request
+def reset_stack_data_age():
+    stack_service.reset_data_age()
+
+@api.after_request
+def add_stack_age_header(response):
+    """Cabecera Age con la antigüedad de los datos de Stack Exchange servidos"""
+    age = stack_service.data_age()
+    if age is not None:
+        response.headers['Age'] = str(int(age))
+    return response
+
+def search_params_from_args(query: Optional[str] = None, site: Optional[str] = None) -> Dict:
+    """Parámetros de búsqueda de Stack Exchange a partir de la query string"""
+    return stack_service.build_search_params(
+        query=query if query is not None else request.args.get('query'),
+        site=site if site is not None else request.args.get('site'),
+        tags=request.args.getlist('tag'),
+        fromdate=request.args.get('fromdate'),
+        todate=request.args.get('todate'),
+        sort=request.args.get('sort'),
+        order=request.args.get('order')
+    )
+
+def with_stack_params(view):
+    """Inyecta los parámetros de búsqueda validados; responde 400 si son inválidos"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            params = search_params_from_args()
+        except ValidationError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        return view(*args, params=params, **kwargs)
+    return wrapper
+
 @api.route('/stack/statistics', methods=['GET'])
-def get_stack_statistics():
+@admission.limit('stack')
+@with_stack_params
+def get_stack_statistics(params):
     """Obtener estadísticas de respuestas"""
     try:
-        stats = stack_service.get_answer_statistics()
+        stats = stack_service.get_answer_statistics(params)
         return jsonify({
             'status': 'success',
             'data': stats
@@ -118,10 +256,12 @@ def get_stack_statistics():
         }), 500
 
 @api.route('/stack/highest-reputation', methods=['GET'])
-def get_highest_reputation():
+@admission.limit('stack')
+@with_stack_params
+def get_highest_reputation(params):
     """Obtener respuesta con mayor reputación"""
     try:
-        answer = stack_service.get_highest_reputation_answer()
+        answer = stack_service.get_highest_reputation_answer(params)
         if not answer:
             return jsonify({
                 'status': 'error',
@@ -138,10 +278,12 @@ def get_highest_reputation():
         }), 500
 
 @api.route('/stack/least-viewed', methods=['GET'])
-def get_least_viewed():
+@admission.limit('stack')
+@with_stack_params
+def get_least_viewed(params):
     """Obtener respuesta menos vista"""
     try:
-        answer = stack_service.get_least_viewed_answer()
+        answer = stack_service.get_least_viewed_answer(params)
         if not answer:
             return jsonify({
                 'status': 'error',
@@ -158,10 +300,12 @@ def get_least_viewed():
         }), 500
 
 @api.route('/stack/timeline', methods=['GET'])
-def get_timeline():
+@admission.limit('stack')
+@with_stack_params
+def get_timeline(params):
     """Obtener línea de tiempo de respuestas"""
     try:
-        timeline = stack_service.get_answer_timeline()
+        timeline = stack_service.get_answer_timeline(params)
         if not timeline['oldest'] or not timeline['newest']:
             return jsonify({
                 'status': 'error',
@@ -178,20 +322,19 @@ def get_timeline():
         }), 500
 
 @api.route('/stack/analytics', methods=['GET'])
-def print_stack_analytics():
+@admission.limit('stack')
+@with_stack_params
+def print_stack_analytics(params):
     """Imprimir y devolver analytics completos"""
     try:
-        # Imprimir en consola
-        stack_service.print_analytics()
-        
-        # Recopilar todos los datos
-        data = {
-            'statistics': stack_service.get_answer_statistics(),
-            'highest_reputation': stack_service.get_highest_reputation_answer(),
-            'least_viewed': stack_service.get_least_viewed_answer(),
-            'timeline': stack_service.get_answer_timeline()
-        }
-        
+        # Una sola consulta a la API y un solo cálculo vectorizado
+        with stack_service.snapshot(params):
+            data = stack_service.get_analytics_report(params)
+
+        # Reporte en consola solo si se pidió explícitamente
+        if current_app.config['STACK_CONSOLE_REPORT']:
+            stack_service.print_analytics(data)
+
         return jsonify({
             'status': 'success',
             'data': data
@@ -200,4 +343,110 @@ def print_stack_analytics():
         return jsonify({
             'status': 'error',
             'message': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+@api.route('/stack/compare', methods=['GET'])
+@admission.limit('stack')
+def compare_stack_queries():
+    """
+    Compara varias consultas o sitios en una sola petición, p. ej.
+    ?query=perl&query=python&site=stackoverflow
+    """
+    queries = request.args.getlist('query') or [None]
+    sites = request.args.getlist('site') or [None]
+    max_queries = current_app.config['STACK_COMPARE_MAX_QUERIES']
+    if len(queries) * len(sites) > max_queries:
+        return jsonify({
+            'status': 'error',
+            'message': f'Máximo {max_queries} combinaciones de consulta y sitio'
+        }), 400
+    try:
+        param_sets = [
+            search_params_from_args(query=query, site=site)
+            for query in queries for site in sites
+        ]
+    except ValidationError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+
+    try:
+        return jsonify({
+            'status': 'success',
+            'data': stack_service.compare_queries(param_sets)
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+# Batch de lecturas
+@api.route('/batch', methods=['POST'])
+def run_batch():
+    """Ejecuta varias lecturas GET de la API en un solo viaje de red"""
+    executor = BatchExecutor(
+        current_app._get_current_object(),
+        stack_service,
+        max_requests=current_app.config['BATCH_MAX_REQUESTS'],
+        max_workers=current_app.config['BATCH_MAX_WORKERS']
+    )
+    try:
+        paths = executor.parse(request.get_json(silent=True))
+    except BatchRequestError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+
+    try:
+        results = executor.run(paths)
+    except AdmissionRejected as e:
+        return admission.rejected_response(e.limiter)
+    return jsonify({
+        'status': 'success',
+        'data': results
+    })
+
+# Jobs asíncronos de analytics
+@api.route('/jobs', methods=['POST'])
+def create_job():
+    """Encola un job de analytics que corre fuera del proceso web"""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('name'), str):
+        return jsonify({
+            'status': 'error',
+            'message': "Se esperaba un objeto con el campo 'name'"
+        }), 400
+    try:
+        job, created = job_manager.submit(
+            current_app._get_current_object(), payload['name'], payload.get('params')
+        )
+    except JobError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+
+    response = jsonify({
+        'status': 'success',
+        'data': dict(job.to_dict(), deduplicated=not created)
+    })
+    response.status_code = 202
+    response.headers['Location'] = f'/api/v1/jobs/{job.id}'
+    return response
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Estado, progreso y resultado de un job"""
+    job = job_manager.get(current_app._get_current_object(), job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job not found'
+        }), 404
+    return jsonify({
+        'status': 'success',
+        'data': job
+    })
@@ -0,0 +1,224 @@
+# app/compression.py
+
+import threading
+import time
+import zlib
+from functools import wraps
+from typing import Callable, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependencia opcional
+    zstandard = None
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Codificaciones soportadas en este entorno, en orden de preferencia del servidor"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return tuple(encodings)
+
+
+def compress_bytes(data: bytes, encoding: str, level: int) -> bytes:
+    """Comprime un cuerpo completo con la codificación indicada"""
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"Codificación no soportada: {encoding}")
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str, level: int) -> Iterator[bytes]:
+    """
+    Comprime un cuerpo enviado por partes. Cada parte se vacía al cliente
+    en cuanto se comprime, para no retrasar respuestas en streaming (p. ej. SSE).
+    """
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        process = lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+    elif encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        process = lambda chunk: compressor.process(chunk) + compressor.flush()
+        finish = compressor.finish
+    elif encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        process = lambda chunk: compressor.compress(chunk) + compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+        finish = compressor.flush
+    else:
+        raise ValueError(f"Codificación no soportada: {encoding}")
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield process(chunk)
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+class Compress:
+    """
+    Extensión que comprime las respuestas según la cabecera Accept-Encoding.
+    Soporta gzip siempre, y brotli/zstd cuando sus paquetes están instalados.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BR_LEVEL', 4)
+        app.config.setdefault('COMPRESS_ZSTD_LEVEL', 3)
+        app.config.setdefault('COMPRESS_MIMETYPES', [
+            'application/json', 'text/event-stream', 'text/html', 'text/plain'
+        ])
+        app.extensions['compress'] = self
+        app.after_request(self.after_request)
+
+    @staticmethod
+    def level_for(app: Flask, encoding: str) -> int:
+        return {
+            'gzip': app.config['COMPRESS_GZIP_LEVEL'],
+            'br': app.config['COMPRESS_BR_LEVEL'],
+            'zstd': app.config['COMPRESS_ZSTD_LEVEL']
+        }[encoding]
+
+    @staticmethod
+    def negotiate(encodings: Iterable[str]) -> Optional[str]:
+        """Elige la codificación con mayor calidad q aceptada por el cliente"""
+        accepted = request.accept_encodings
+        best, best_quality = None, 0
+        for encoding in encodings:
+            quality = accepted.quality(encoding)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def after_request(self, response: Response) -> Response:
+        config = current_app.config
+        if (not config['COMPRESS_ENABLED']
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.status_code < 200
+                or response.status_code in (204, 206, 304)
+                or response.mimetype not in config['COMPRESS_MIMETYPES']):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate(available_encodings())
+        if encoding is None:
+            return response
+        level = self.level_for(current_app, encoding)
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < config['COMPRESS_MIN_SIZE']:
+                return response
+            response.set_data(compress_bytes(data, encoding, level))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+class CachedPayload:
+    """Cuerpo ya serializado cuyas versiones comprimidas se calculan una sola vez"""
+
+    __slots__ = ('body', 'mimetype', 'created_at', '_variants', '_lock')
+
+    def __init__(self, body: bytes, mimetype: str = 'application/json'):
+        self.body = body
+        self.mimetype = mimetype
+        self.created_at = time.monotonic()
+        self._variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str, level: int) -> bytes:
+        variant = self._variants.get(encoding)
+        if variant is None:
+            with self._lock:
+                variant = self._variants.get(encoding)
+                if variant is None:
+                    variant = compress_bytes(self.body, encoding, level)
+                    self._variants[encoding] = variant
+        return variant
+
+    def to_response(self) -> Response:
+        """Construye la respuesta con la variante negociada, sin volver a comprimir"""
+        response = Response(self.body, mimetype=self.mimetype)
+        response.vary.add('Accept-Encoding')
+        config = current_app.config
+        if not config['COMPRESS_ENABLED'] or len(self.body) < config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = Compress.negotiate(available_encodings())
+        if encoding is not None:
+            response.set_data(self.encoded(encoding, Compress.level_for(current_app, encoding)))
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+
+class PayloadCache:
+    """Caché en memoria de respuestas serializadas (y comprimidas) con expiración"""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple, CachedPayload] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[CachedPayload]:
+        ttl = self.ttl if self.ttl is not None else current_app.config['RESPONSE_CACHE_TTL']
+        payload = self._entries.get(key)
+        if payload is None or time.monotonic() - payload.created_at > ttl:
+            return None
+        return payload
+
+    def set(self, key: Tuple, payload: CachedPayload) -> CachedPayload:
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = payload
+        return payload
+
+    def cached(self, version: Callable[[], Hashable] = lambda: 0):
+        """
+        Decorador para vistas JSON: guarda el cuerpo de las respuestas 200
+        bajo (ruta completa, versión de datos) y las sirve ya comprimidas.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = (request.full_path, version())
+                payload = self.get(key)
+                if payload is None:
+                    response = view(*args, **kwargs)
+                    if not isinstance(response, Response) or response.status_code != 200:
+                        return response
+                    payload = self.set(key, CachedPayload(response.get_data(), response.mimetype))
+                return payload.to_response()
+            return wrapper
+        return decorator
@@ -17,6 +17,78 @@ class Config:
     
     # API
     STACK_EXCHANGE_API_URL = os.getenv('STACK_EXCHANGE_API_URL')
+    STACK_COMPARE_MAX_QUERIES = int(os.getenv('STACK_COMPARE_MAX_QUERIES', 6))
+    # Sin valor se usa instance/stack_snapshot.json.gz de la app (ver INSTANCE_FILES); '' lo desactiva
+    STACK_SNAPSHOT_PATH = os.getenv('STACK_SNAPSHOT_PATH')
+
+    # Stream de analytics (SSE)
+    ANALYTICS_STREAM_POLL_INTERVAL = float(os.getenv('ANALYTICS_STREAM_POLL_INTERVAL', 5))
+    ANALYTICS_STREAM_KEEPALIVE = float(os.getenv('ANALYTICS_STREAM_KEEPALIVE', 15))
+
+    # Matriz de conteos de vuelos
+    MATRIX_MAX_DENSE_CELLS = int(os.getenv('MATRIX_MAX_DENSE_CELLS', 1000000))
+
+    # Paginación por id de /flights: tamaño de página por defecto y tope de ?limit=
+    FLIGHTS_PAGE_SIZE = int(os.getenv('FLIGHTS_PAGE_SIZE', 500))
+    FLIGHTS_MAX_PAGE_SIZE = int(os.getenv('FLIGHTS_MAX_PAGE_SIZE', 5000))
+
+    # Series de tiempo: máximo de puntos por serie (por defecto y tope de ?max_points=)
+    TIMESERIES_MAX_POINTS = int(os.getenv('TIMESERIES_MAX_POINTS', 200))
+    # Tope de buckets que puede abarcar un rango from/to (100 años de días)
+    TIMESERIES_MAX_BUCKETS = int(os.getenv('TIMESERIES_MAX_BUCKETS', 36525))
+
+    # Compresión de respuestas
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BR_LEVEL = int(os.getenv('COMPRESS_BR_LEVEL', 4))
+    COMPRESS_ZSTD_LEVEL = int(os.getenv('COMPRESS_ZSTD_LEVEL', 3))
+
+    # Caché de respuestas ya serializadas (segundos)
+    RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 30))
+
+    # Control de admisión por grupo de rutas costosas
+    ADMISSION_LIMITS = {
+        'stack': {
+            'max_concurrent': int(os.getenv('ADMISSION_STACK_CONCURRENCY', 4)),
+            'max_queue': int(os.getenv('ADMISSION_STACK_QUEUE', 8)),
+            'queue_timeout': float(os.getenv('ADMISSION_STACK_QUEUE_TIMEOUT', 2)),
+            'retry_after': int(os.getenv('ADMISSION_STACK_RETRY_AFTER', 5))
+        },
+        'analytics': {
+            'max_concurrent': int(os.getenv('ADMISSION_ANALYTICS_CONCURRENCY', 4)),
+            'max_queue': int(os.getenv('ADMISSION_ANALYTICS_QUEUE', 16)),
+            'queue_timeout': float(os.getenv('ADMISSION_ANALYTICS_QUEUE_TIMEOUT', 5)),
+            'retry_after': int(os.getenv('ADMISSION_ANALYTICS_RETRY_AFTER', 2))
+        }
+    }
+
+    # Resúmenes probabilísticos para ?approx=true
+    SKETCH_STATE_PATH = os.getenv('SKETCH_STATE_PATH')
+    SKETCH_TOP_K = int(os.getenv('SKETCH_TOP_K', 64))
+    SKETCH_HLL_PRECISION = int(os.getenv('SKETCH_HLL_PRECISION', 12))
+    SKETCH_SAVE_INTERVAL = float(os.getenv('SKETCH_SAVE_INTERVAL', 60))
+
+    # Jobs asíncronos de analytics
+    JOBS_MAX_WORKERS = int(os.getenv('JOBS_MAX_WORKERS', 2))
+    JOB_RESULTS_DIR = os.getenv('JOB_RESULTS_DIR')
+
+    # Logging estructurado (JSON) a través de una cola
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    # Fracción de eventos de alto volumen que se registran, p. ej. "stack.cache=0.05,admission.shed=0.1"
+    LOG_SAMPLE_RATES = {
+        event.strip(): float(rate)
+        for event, _, rate in (item.partition('=') for item in
+                               os.getenv('LOG_SAMPLE_RATES', 'stack.cache=0.05').split(',')
+                               if item)
+    }
+    # Reporte legible de /stack/analytics en la consola (solo para depurar)
+    STACK_CONSOLE_REPORT = os.getenv('STACK_CONSOLE_REPORT', 'false').lower() == 'true'
+
+    # Batch de peticiones
+    BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+    BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 4))
     
     # Security
     SECRET_KEY = os.getenv('SECRET_KEY')
@@ -29,6 +101,14 @@ class ProductionConfig(Config):
     """Configuración de producción"""
     DEBUG = False
 
+# Rutas que, sin valor en el entorno, se resuelven dentro de app.instance_path
+# (no contra el directorio actual, que depende de desde dónde se lance el proceso)
+INSTANCE_FILES = {
+    'STACK_SNAPSHOT_PATH': 'stack_snapshot.json.gz',
+    'SKETCH_STATE_PATH': 'flight_sketches.json',
+    'JOB_RESULTS_DIR': 'jobs'
+}
+
 # Diccionario de configuraciones
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,170 @@
+# app/services/analytics_stream.py
+
+import json
+import queue
+import threading
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Flight
+from .flight_analytics import get_analytics_snapshot
+from .flight_sketches import flight_sketches
+
+
+class DataVersion:
+    """
+    Contador de versión de los datos de vuelos.
+    Se incrementa cada vez que se confirma (commit) un cambio sobre la tabla flights.
+    """
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+        self.changed = threading.Event()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            value = self._value
+        self.changed.set()
+        return value
+
+
+data_version = DataVersion()
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flight_changes(session, flush_context):
+    """Marca la sesión si el flush incluyó vuelos nuevos, modificados o borrados"""
+    objects = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(isinstance(obj, Flight) for obj in objects):
+        session.info['flights_changed'] = True
+    # Vuelos nuevos para los resúmenes aproximados; se aplican solo si hay commit
+    new_flights = [(obj.id_aerolinea, obj.id_aeropuerto, obj.dia)
+                   for obj in session.new if isinstance(obj, Flight)]
+    if new_flights:
+        session.info.setdefault('new_flights', []).extend(new_flights)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_on_commit(session):
+    """Incrementa la versión de datos solo cuando el cambio ya es visible"""
+    new_flights = session.info.pop('new_flights', None)
+    if new_flights:
+        flight_sketches.apply(new_flights)
+    if session.info.pop('flights_changed', False):
+        data_version.bump()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('flights_changed', None)
+    session.info.pop('new_flights', None)
+
+
+class AnalyticsBroadcaster:
+    """
+    Calcula los analytics de vuelos una sola vez por cambio de datos
+    y reparte el mismo payload a todos los clientes SSE conectados.
+    """
+
+    def __init__(self, poll_interval: float = 5.0, queue_size: int = 8):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+        self._last_payload: Optional[Tuple[int, str]] = None
+        self._last_fingerprint = None
+
+    def subscribe(self, app) -> queue.Queue:
+        """Registra un cliente y le entrega de inmediato el último payload conocido"""
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._app = app
+            self.poll_interval = app.config.get('ANALYTICS_STREAM_POLL_INTERVAL', self.poll_interval)
+            self._subscribers.add(subscriber)
+            if self._last_payload is not None:
+                subscriber.put_nowait(self._last_payload)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='analytics-broadcaster', daemon=True
+                )
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _fingerprint(self) -> Tuple:
+        """Huella barata de la tabla para detectar inserciones de otros procesos"""
+        return tuple(db.session.query(
+            db.func.count(Flight.id),
+            db.func.max(Flight.id)
+        ).one())
+
+    def _publish(self, message: Tuple[int, str]) -> None:
+        with self._lock:
+            self._last_payload = message
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # Cliente lento: se descarta el payload más viejo
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+                subscriber.put_nowait(message)
+
+    def _compute(self) -> None:
+        version = data_version.value
+        with self._app.app_context():
+            try:
+                fingerprint = (version,) + self._fingerprint()
+                if fingerprint == self._last_fingerprint and self._last_payload is not None:
+                    return
+                payload: Dict = get_analytics_snapshot()
+            finally:
+                db.session.remove()
+        self._last_fingerprint = fingerprint
+        self._publish((version, json.dumps(payload)))
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            data_version.changed.clear()
+            try:
+                self._compute()
+            except Exception as e:
+                self._app.logger.error("Error al calcular analytics para el stream: %s", e,
+                                       extra={'event': 'analytics.stream_error'})
+            data_version.changed.wait(self.poll_interval)
+
+
+analytics_broadcaster = AnalyticsBroadcaster()
+
+
+def format_sse(data: str, event_name: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    """Da formato a un mensaje Server-Sent Events"""
+    message = ''
+    if event_id is not None:
+        message += f'id: {event_id}\n'
+    if event_name:
+        message += f'event: {event_name}\n'
+    for line in data.splitlines():
+        message += f'data: {line}\n'
+    return message + '\n'
@@ -0,0 +1,134 @@
+# app/services/batch_service.py
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Dict, List, Set, Tuple, Union
+from urllib.parse import urlsplit
+
+from flask import Flask
+from werkzeug.exceptions import HTTPException
+
+from ..admission import admission
+from .stackoverflow_service import StackOverflowService
+
+
+class BatchRequestError(Exception):
+    """Error en el formato de una petición batch"""
+    pass
+
+
+class BatchExecutor:
+    """
+    Ejecuta varias lecturas GET contra las rutas existentes dentro del mismo proceso.
+
+    Cada sub-petición pasa por full_dispatch_request (hooks before/after_request y
+    manejadores de error incluidos) dentro de su propio contexto de aplicación, así
+    que no comparte `g` ni la sesión de SQLAlchemy con el batch ni con otros hilos.
+    Las rutas de base de datos corren en secuencia; las de Stack Exchange no tocan
+    la base de datos y corren en paralelo, todas sobre un único snapshot de la API.
+    El batch toma de entrada un cupo de admisión por grupo de rutas y sus
+    sub-peticiones corren bajo ese cupo, de modo que no se rechazan entre sí.
+    """
+
+    # Rutas que no se pueden anidar dentro de un batch
+    EXCLUDED_ENDPOINTS = {'api.run_batch', 'api.stream_analytics'}
+    # Prefijos de rutas seguras para ejecutarse en paralelo (sin acceso a la base de datos)
+    PARALLEL_PREFIXES = ('/api/v1/stack/',)
+
+    def __init__(self, app: Flask, stack_service: StackOverflowService,
+                 max_requests: int = 20, max_workers: int = 4):
+        self.app = app
+        self.stack_service = stack_service
+        self.max_requests = max_requests
+        self.max_workers = max_workers
+
+    def parse(self, payload: Dict) -> List[str]:
+        """Valida el cuerpo de la petición y devuelve la lista de rutas a ejecutar"""
+        if not isinstance(payload, dict) or not isinstance(payload.get('requests'), list):
+            raise BatchRequestError("Se esperaba un objeto con la lista 'requests'")
+        sub_requests = payload['requests']
+        if not sub_requests:
+            raise BatchRequestError("La lista 'requests' está vacía")
+        if len(sub_requests) > self.max_requests:
+            raise BatchRequestError(f"Máximo {self.max_requests} peticiones por batch")
+
+        paths = []
+        for sub_request in sub_requests:
+            if isinstance(sub_request, str):
+                sub_request = {'path': sub_request}
+            if not isinstance(sub_request, dict) or not isinstance(sub_request.get('path'), str):
+                raise BatchRequestError("Cada petición debe tener un campo 'path'")
+            if sub_request.get('method', 'GET').upper() != 'GET':
+                raise BatchRequestError("Solo se permiten peticiones GET en un batch")
+            paths.append(sub_request['path'])
+        return paths
+
+    def _match(self, path: str) -> Tuple[str, Dict]:
+        adapter = self.app.url_map.bind('localhost')
+        return adapter.match(urlsplit(path).path, method='GET')
+
+    def admission_groups(self, paths: List[str]) -> Set[str]:
+        """Grupos de admisión de las rutas del batch (ver admission.limit)"""
+        groups = set()
+        for path in paths:
+            try:
+                endpoint, _ = self._match(path)
+            except HTTPException:
+                continue
+            group = getattr(self.app.view_functions[endpoint], 'admission_group', None)
+            if group is not None:
+                groups.add(group)
+        return groups
+
+    def _execute(self, path: str) -> Dict:
+        """Despacha una ruta como una petición completa y devuelve su estado y cuerpo JSON"""
+        try:
+            endpoint, _ = self._match(path)
+            if endpoint in self.EXCLUDED_ENDPOINTS:
+                return {'path': path, 'status': 400,
+                        'body': {'status': 'error', 'message': 'Ruta no permitida en un batch'}}
+            # Contexto de aplicación nuevo: sesión de SQLAlchemy y `g` propios
+            with self.app.app_context(), self.app.test_request_context(path, method='GET'):
+                response = self.app.full_dispatch_request()
+                return {'path': path, 'status': response.status_code,
+                        'body': response.get_json(silent=True)}
+        except HTTPException as e:
+            return {'path': path, 'status': e.code,
+                    'body': {'status': 'error', 'message': e.description}}
+        except Exception as e:
+            return {'path': path, 'status': 500,
+                    'body': {'status': 'error', 'message': str(e)}}
+
+    def _is_parallel(self, path: str) -> bool:
+        return urlsplit(path).path.startswith(self.PARALLEL_PREFIXES)
+
+    def run(self, paths: List[str]) -> List[Dict]:
+        """
+        Ejecuta todas las rutas y devuelve los resultados en el orden recibido.
+        Lanza AdmissionRejected si no hay cupo para alguno de sus grupos de rutas.
+        """
+        results: List[Union[Dict, None]] = [None] * len(paths)
+        parallel = [i for i, path in enumerate(paths) if self._is_parallel(path)]
+        sequential = [i for i, path in enumerate(paths) if not self._is_parallel(path)]
+
+        with ExitStack() as stack:
+            stack.enter_context(admission.hold(self.admission_groups(paths)))
+            if parallel:
+                # Una sola consulta a Stack Exchange para todo el batch; si falla,
+                # cada ruta reporta su propio error
+                try:
+                    stack.enter_context(self.stack_service.snapshot())
+                except Exception:
+                    pass
+                executor = stack.enter_context(ThreadPoolExecutor(max_workers=self.max_workers))
+                futures = {
+                    i: executor.submit(contextvars.copy_context().run, self._execute, paths[i])
+                    for i in parallel
+                }
+            for i in sequential:
+                results[i] = self._execute(paths[i])
+            if parallel:
+                for i, future in futures.items():
+                    results[i] = future.result()
+        return results
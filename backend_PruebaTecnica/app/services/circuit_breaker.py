@@ -0,0 +1,61 @@
+# app/services/circuit_breaker.py
+
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker simple para llamadas a servicios externos.
+
+    - closed: las llamadas pasan normalmente.
+    - open: tras `failure_threshold` fallos seguidos se dejan de hacer llamadas
+      durante `reset_timeout` segundos.
+    - half_open: pasado ese tiempo se permite una llamada de prueba; si funciona
+      el circuito se cierra, si falla se vuelve a abrir.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Indica si se puede intentar la llamada; en half_open solo deja pasar una"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != self.CLOSED
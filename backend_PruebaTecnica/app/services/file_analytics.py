@@ -0,0 +1,223 @@
+# app/services/file_analytics.py
+
+import csv
+import mmap
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Columnas necesarias del CSV (mismos nombres que la tabla flights)
+REQUIRED_COLUMNS = ('id_aerolinea', 'id_aeropuerto', 'dia')
+CHUNKS_PER_WORKER = 4
+
+
+class FileAnalyticsError(Exception):
+    """Archivo de vuelos ilegible o con columnas faltantes"""
+    pass
+
+
+class FlightAggregates:
+    """
+    Conteos parciales de un rango del archivo. Se combinan con merge()
+    y de ellos salen los mismos resultados que las rutas /analytics/*.
+    Por fila solo se cuentan aeropuerto y (aerolínea, día); los totales por
+    aerolínea y por día se derivan de este último al final.
+    """
+
+    __slots__ = ('airports', 'airline_days', 'rows', 'skipped')
+
+    def __init__(self):
+        self.airports: Counter = Counter()
+        self.airline_days: Counter = Counter()
+        self.rows = 0
+        self.skipped = 0
+
+    def merge(self, other: 'FlightAggregates') -> 'FlightAggregates':
+        self.airports.update(other.airports)
+        self.airline_days.update(other.airline_days)
+        self.rows += other.rows
+        self.skipped += other.skipped
+        return self
+
+    def airlines(self) -> Counter:
+        totals: Counter = Counter()
+        for (airline, _), total in self.airline_days.items():
+            totals[airline] += total
+        return totals
+
+    def days(self) -> Counter:
+        totals: Counter = Counter()
+        for (_, dia), total in self.airline_days.items():
+            totals[dia] += total
+        return totals
+
+    def results(self, airline_names: Optional[Dict[int, str]] = None,
+                airport_names: Optional[Dict[int, str]] = None) -> Dict:
+        """Resultados con la misma forma que flight_analytics.get_analytics_snapshot()"""
+        airline_names = airline_names or {}
+        airport_names = airport_names or {}
+        airport = max(self.airports.items(), key=lambda item: item[1], default=None)
+        airline = max(self.airlines().items(), key=lambda item: item[1], default=None)
+        day = max(self.days().items(), key=lambda item: item[1], default=None)
+        return {
+            'busiest_airport': {
+                'airport': airport_names.get(airport[0], str(airport[0])) if airport else None,
+                'total_movements': airport[1] if airport else 0
+            },
+            'most_active_airline': {
+                'airline': airline_names.get(airline[0], str(airline[0])) if airline else None,
+                'total_flights': airline[1] if airline else 0
+            },
+            'busiest_day': {
+                'date': day[0] if day else None,
+                'total_flights': day[1] if day else 0
+            },
+            'airlines_multiple_daily': [{
+                'airline': airline_names.get(airline_id, str(airline_id)),
+                'date': dia,
+                'flights': total
+            } for (airline_id, dia), total in sorted(self.airline_days.items()) if total > 2]
+        }
+
+
+def _split_quoted(line: bytes) -> List[bytes]:
+    """
+    Separa una línea con comillas con las reglas de CSV ("a,b" es un campo, "" es
+    una comilla). Los rangos se cortan en saltos de línea, así que un campo entre
+    comillas que continúa en la línea siguiente no se puede leer.
+    """
+    try:
+        row = next(csv.reader([line.decode('utf-8', 'replace')], strict=True), [])
+    except csv.Error as e:
+        raise FileAnalyticsError(f"Línea CSV inválida ({e}): no se admiten saltos de línea "
+                                 f"dentro de un campo entre comillas")
+    return [field.encode('utf-8') for field in row]
+
+
+def _read_header(path: str) -> Tuple[Tuple[int, ...], int]:
+    """Posición de cada columna necesaria y offset donde empiezan los datos"""
+    with open(path, 'rb') as handle:
+        header = handle.readline()
+    line = header.removeprefix(b'\xef\xbb\xbf')  # BOM de UTF-8
+    raw_names = _split_quoted(line) if b'"' in line else line.split(b',')
+    names = [name.decode('utf-8', 'replace').strip().lower() for name in raw_names]
+    missing = [column for column in REQUIRED_COLUMNS if column not in names]
+    if missing:
+        raise FileAnalyticsError(f"Faltan columnas en el encabezado: {', '.join(missing)}")
+    return tuple(names.index(column) for column in REQUIRED_COLUMNS), len(header)
+
+
+def chunk_ranges(path: str, start: int, chunks: int) -> List[Tuple[int, int]]:
+    """
+    Divide [start, fin de archivo) en rangos de bytes que empiezan y terminan
+    en un salto de línea, para que cada línea pertenezca a un solo rango.
+    """
+    size = os.path.getsize(path)
+    if size <= start:
+        return []
+    step = max(1, (size - start) // chunks)
+    with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        bounds = [start]
+        for target in range(start + step, size, step):
+            if target <= bounds[-1]:
+                continue
+            newline = data.find(b'\n', target)
+            if newline == -1:
+                break
+            if newline + 1 < size:
+                bounds.append(newline + 1)
+        bounds.append(size)
+    return [(begin, end) for begin, end in zip(bounds, bounds[1:]) if begin < end]
+
+
+def aggregate_range(path: str, start: int, end: int, columns: Tuple[int, ...]) -> FlightAggregates:
+    """Cuenta los vuelos de las líneas en [start, end); se ejecuta en un proceso hijo"""
+    airline_col, airport_col, day_col = columns
+    needed = max(columns)
+    aggregates = FlightAggregates()
+    airports, airline_days = aggregates.airports, aggregates.airline_days
+    with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        data.seek(start)
+        while data.tell() < end:
+            line = data.readline()
+            if not line.strip():
+                continue
+            # Camino rápido sin comillas; las líneas con comillas se leen como CSV
+            fields = _split_quoted(line) if b'"' in line else line.split(b',')
+            if len(fields) <= needed:
+                aggregates.skipped += 1
+                continue
+            try:
+                airline = int(fields[airline_col])
+                airport = int(fields[airport_col])
+            except ValueError:
+                aggregates.skipped += 1
+                continue
+            # Acepta 'YYYY-MM-DD' y 'YYYY-MM-DD HH:MM:SS'
+            dia = fields[day_col].strip()[:10].decode('ascii', 'replace')
+            airports[airport] += 1
+            airline_days[(airline, dia)] += 1
+            aggregates.rows += 1
+    return aggregates
+
+
+def analyze_file(path: str, workers: Optional[int] = None) -> FlightAggregates:
+    """
+    Calcula los agregados de un CSV de vuelos sin pasar por la base de datos:
+    el archivo se divide en rangos de bytes que se cuentan en paralelo en un
+    pool de procesos y los conteos parciales se combinan al final.
+    """
+    workers = workers or os.cpu_count() or 1
+    columns, data_start = _read_header(path)
+    ranges = chunk_ranges(path, data_start, workers * CHUNKS_PER_WORKER)
+    total = FlightAggregates()
+    if not ranges:
+        return total
+    if workers == 1 or len(ranges) == 1:
+        for start, end in ranges:
+            total.merge(aggregate_range(path, start, end, columns))
+        return total
+    # spawn: igual que los jobs, los hijos no heredan conexiones ni hilos del proceso padre
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=context) as executor:
+        futures = [executor.submit(aggregate_range, path, start, end, columns) for start, end in ranges]
+        for future in futures:
+            total.merge(future.result())
+    return total
+
+
+def compare_with_sql(aggregates: FlightAggregates, file_results: Dict, sql_results: Dict,
+                     airline_names: Dict[int, str], airport_names: Dict[int, str]) -> List[str]:
+    """
+    Diferencias entre el resultado del archivo y el de flight_analytics.
+    En los máximos con empate basta con que el valor elegido por SQL tenga
+    el mismo conteo en el archivo.
+    """
+    differences = []
+    airline_ids = {name: key for key, name in airline_names.items()}
+    airport_ids = {name: key for key, name in airport_names.items()}
+
+    def check_top(name: str, label: str, total: str, counts: Counter, lookup) -> None:
+        expected, actual = sql_results[name], file_results[name]
+        if expected[total] != actual[total]:
+            differences.append(f"{name}: SQL {expected[total]} vs archivo {actual[total]}")
+        elif expected[label] != actual[label] and counts.get(lookup(expected[label])) != actual[total]:
+            differences.append(f"{name}: SQL '{expected[label]}' vs archivo '{actual[label]}'")
+
+    check_top('busiest_airport', 'airport', 'total_movements', aggregates.airports,
+              lambda name: airport_ids.get(name))
+    check_top('most_active_airline', 'airline', 'total_flights', aggregates.airlines(),
+              lambda name: airline_ids.get(name))
+    check_top('busiest_day', 'date', 'total_flights', aggregates.days(), lambda day: day)
+
+    def as_set(rows: List[Dict]) -> set:
+        return {(row['airline'], row['date'], row['flights']) for row in rows}
+
+    expected, actual = as_set(sql_results['airlines_multiple_daily']), as_set(file_results['airlines_multiple_daily'])
+    for row in sorted(expected - actual):
+        differences.append(f"airlines_multiple_daily: falta en el archivo {row}")
+    for row in sorted(actual - expected):
+        differences.append(f"airlines_multiple_daily: sobra en el archivo {row}")
+    return differences
@@ -0,0 +1,89 @@
+# app/services/flight_analytics.py
+
+from typing import Dict, List
+
+from app import db
+from app.models import Airline, Airport, Flight
+
+
+def get_busiest_airport() -> Dict:
+    """Aeropuerto que ha tenido mayor movimiento durante el año"""
+    result = db.session.query(
+        Airport.nombre_aeropuerto,
+        db.func.count(Flight.id).label('total_movements')
+    ).join(Flight).group_by(Airport.id_aeropuerto, Airport.nombre_aeropuerto)\
+    .order_by(db.func.count(Flight.id).desc()).first()
+
+    return {
+        'airport': result[0] if result else None,
+        'total_movements': result[1] if result else 0
+    }
+
+
+def get_most_active_airline() -> Dict:
+    """Aerolínea con mayor número de vuelos"""
+    result = db.session.query(
+        Airline.nombre_aerolinea,
+        db.func.count(Flight.id).label('total_flights')
+    ).join(Flight).group_by(Airline.id_aerolinea, Airline.nombre_aerolinea)\
+    .order_by(db.func.count(Flight.id).desc()).first()
+
+    return {
+        'airline': result[0] if result else None,
+        'total_flights': result[1] if result else 0
+    }
+
+
+def get_busiest_day() -> Dict:
+    """Día con mayor número de vuelos"""
+    result = db.session.query(
+        Flight.dia,
+        db.func.count(Flight.id).label('total_flights')
+    ).group_by(Flight.dia)\
+    .order_by(db.func.count(Flight.id).desc()).first()
+
+    return {
+        'date': result[0].strftime('%Y-%m-%d') if result else None,
+        'total_flights': result[1] if result else 0
+    }
+
+
+def get_airlines_multiple_daily() -> List[Dict]:
+    """Aerolíneas con más de 2 vuelos por día"""
+    result = db.session.query(
+        Airline.nombre_aerolinea,
+        Flight.dia,
+        db.func.count(Flight.id).label('flights_per_day')
+    ).join(Airline)\
+    .group_by(Airline.nombre_aerolinea, Flight.dia)\
+    .having(db.func.count(Flight.id) > 2).all()
+
+    return [{
+        'airline': r[0],
+        'date': r[1].strftime('%Y-%m-%d'),
+        'flights': r[2]
+    } for r in result]
+
+
+def get_airline_active_days() -> List[Dict]:
+    """Días distintos con vuelos por aerolínea"""
+    result = db.session.query(
+        Airline.nombre_aerolinea,
+        db.func.count(db.func.distinct(Flight.dia)).label('active_days')
+    ).join(Flight).group_by(Airline.id_aerolinea, Airline.nombre_aerolinea)\
+    .order_by(db.func.count(db.func.distinct(Flight.dia)).desc()).all()
+
+    return [{
+        'airline': r[0],
+        'active_days': r[1]
+    } for r in result]
+
+
+def get_analytics_snapshot() -> Dict:
+    """Todos los agregados de vuelos en un solo diccionario"""
+    return {
+        'busiest_airport': get_busiest_airport(),
+        'most_active_airline': get_most_active_airline(),
+        'busiest_day': get_busiest_day(),
+        'airlines_multiple_daily': get_airlines_multiple_daily()
+    }
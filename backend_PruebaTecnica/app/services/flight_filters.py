@@ -0,0 +1,66 @@
+# app/services/flight_filters.py
+
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from app import db
+from app.models import Flight, Movement
+
+
+class FilterError(ValueError):
+    """Parámetros de consulta inválidos en los endpoints de analytics"""
+    pass
+
+
+def parse_date(name: str, value: str) -> date:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise FilterError(f"Fecha inválida en '{name}', se espera YYYY-MM-DD")
+
+
+def parse_int(name: str, value: str, minimum: int = 0, maximum: Optional[int] = None) -> int:
+    """
+    Entero en [minimum, maximum]. Se usa int() con try en lugar de isdigit():
+    isdigit() acepta caracteres como '²' que int() rechaza con ValueError.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise FilterError(f"'{name}' debe ser un entero")
+    if number < minimum or (maximum is not None and number > maximum):
+        limits = f"entre {minimum} y {maximum}" if maximum is not None else f"mayor o igual a {minimum}"
+        raise FilterError(f"'{name}' debe ser un entero {limits}")
+    return number
+
+
+def _parse_id(name: str, value: str) -> int:
+    try:
+        return parse_int(name, value)
+    except FilterError:
+        raise FilterError(f"'{name}' debe ser un id numérico")
+
+
+def build_filters(args: Dict[str, str]) -> List:
+    """Filtros opcionales: airline, airport, movement (id o descripción), from, to"""
+    filters = []
+    if args.get('airline'):
+        filters.append(Flight.id_aerolinea == _parse_id('airline', args['airline']))
+    if args.get('airport'):
+        filters.append(Flight.id_aeropuerto == _parse_id('airport', args['airport']))
+    movement = args.get('movement')
+    if movement:
+        try:
+            filters.append(Flight.id_movimiento == int(movement))
+        except ValueError:
+            movement_id = db.session.query(Movement.id_movimiento).filter(
+                db.func.lower(Movement.descripcion) == movement.lower()
+            ).scalar()
+            if movement_id is None:
+                raise FilterError(f"Movimiento desconocido '{movement}'")
+            filters.append(Flight.id_movimiento == movement_id)
+    if args.get('from'):
+        filters.append(Flight.dia >= parse_date('from', args['from']))
+    if args.get('to'):
+        filters.append(Flight.dia <= parse_date('to', args['to']))
+    return filters
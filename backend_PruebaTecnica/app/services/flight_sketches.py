@@ -0,0 +1,404 @@
+# app/services/flight_sketches.py
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+
+from app import db
+from app.models import Airline, Airport, Flight
+from .sketches import HyperLogLog, SpaceSaving
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 3
+
+
+class SketchConflictError(Exception):
+    """Otro proceso mantiene los resúmenes del mismo archivo de estado"""
+    pass
+
+
+def _try_lock(fd: int) -> bool:
+    """Candado exclusivo sin espera; el sistema lo libera si el proceso termina"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+class FlightSketches:
+    """
+    Resúmenes probabilísticos de la tabla flights para analytics aproximados.
+
+    El estado inicial se construye solo con `flask rebuild-sketches`, que recorre
+    la tabla completa y lo guarda en disco. Después se mantiene al insertar: los
+    hooks de sesión de analytics_stream pasan a apply() los vuelos nuevos de cada
+    commit, sin importar el orden de sus ids. apply() solo los encola; un hilo
+    aparte los incorpora y guarda el estado cada SKETCH_SAVE_INTERVAL segundos.
+    Mientras no haya estado cargado las rutas usan el GROUP BY exacto.
+
+    Funciona con un único proceso que escribe vuelos y atiende ?approx=true
+    (p. ej. `flask run` o gunicorn -w 1): ese proceso toma un candado sobre
+    `<SKETCH_STATE_PATH>.lock`. Si otro proceso inserta vuelos o consulta los
+    resúmenes mientras tanto, sus vuelos no llegarían al estado, así que deja
+    `<SKETCH_STATE_PATH>.conflict` y todos responden 409 a ?approx=true hasta
+    el próximo rebuild (con los demás procesos detenidos).
+
+    No se reflejan (hasta el próximo rebuild): borrados y modificaciones e
+    inserciones masivas con Core (session.execute(insert)).
+    Los días son un conjunto acotado (365 por año) y se cuentan de forma exacta;
+    Space-Saving solo se usa para aeropuertos y aerolíneas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        self._target: Optional[str] = None  # SKETCH_STATE_PATH configurado
+        self._path: Optional[str] = None
+        self._role: Optional[str] = None  # 'owner', 'conflict' o 'error' para self._path
+        self._lock_fd: Optional[int] = None
+        self._pending: List[Tuple[int, int, date]] = []
+        self._dirty = False
+        self._wake = threading.Event()
+        self._saver: Optional[threading.Thread] = None
+        self._save_interval = 60.0
+        self._reset()
+
+    def _reset(self, top_k: int = 64, hll_precision: int = 12) -> None:
+        self.top_k = top_k
+        self.hll_precision = hll_precision
+        self.airports = SpaceSaving(top_k)
+        self.airlines = SpaceSaving(top_k)
+        self.days: Counter = Counter()
+        self.active_days: Dict[str, HyperLogLog] = {}
+
+    # Persistencia
+    def to_dict(self) -> Dict:
+        return {
+            'version': STATE_VERSION,
+            'hll_precision': self.hll_precision,
+            'airports': self.airports.to_dict(),
+            'airlines': self.airlines.to_dict(),
+            'days': dict(self.days),
+            'active_days': {key: hll.to_dict() for key, hll in self.active_days.items()}
+        }
+
+    def _load_state(self, state: Dict) -> None:
+        self.hll_precision = state['hll_precision']
+        self.airports = SpaceSaving.from_dict(state['airports'])
+        self.airlines = SpaceSaving.from_dict(state['airlines'])
+        self.top_k = self.airports.k
+        self.days = Counter(state['days'])
+        self.active_days = {
+            key: HyperLogLog.from_dict(value) for key, value in state['active_days'].items()
+        }
+
+    @staticmethod
+    def _write(path: str, state: Dict) -> None:
+        """Escritura atómica: archivo temporal en el mismo directorio + os.replace"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.sketches-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as handle:
+                json.dump(state, handle, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def save(self, path: str) -> None:
+        self._write(path, self.to_dict())
+
+    def load(self, path: str) -> bool:
+        try:
+            with open(path) as handle:
+                state = json.load(handle)
+        except (OSError, ValueError):
+            return False
+        if state.get('version') != STATE_VERSION:
+            return False
+        self._load_state(state)
+        return True
+
+    # Escritor único
+    def _claim(self, path: str) -> str:
+        """
+        Rol de este proceso para `path`; se resuelve una vez por ruta y con el lock
+        tomado. Si otro proceso tiene el candado se deja la marca de conflicto.
+        """
+        if self._path == path:
+            return self._role
+        self._release()
+        self._path = path
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            fd = os.open(f'{path}.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            logger.warning("No se pudo abrir el candado de los resúmenes: %s", e,
+                           extra={'event': 'sketch.lock_failed'})
+            self._role = 'error'
+            return self._role
+        if _try_lock(fd):
+            self._lock_fd = fd
+            self._role = 'owner'
+            return self._role
+        os.close(fd)
+        self._role = 'conflict'
+        logger.error("Otro proceso mantiene los resúmenes de %s; ?approx=true queda desactivado", path,
+                     extra={'event': 'sketch.conflict', 'pid': os.getpid()})
+        self._mark_conflict(path)
+        return self._role
+
+    @staticmethod
+    def _mark_conflict(path: str) -> None:
+        """Marca que leen todos los procesos: hay vuelos que el escritor no ve"""
+        try:
+            with open(f'{path}.conflict', 'w') as handle:
+                handle.write(str(os.getpid()))
+        except OSError:
+            pass
+
+    def _release(self) -> None:
+        """Suelta el candado y el estado de la ruta anterior (cambio de configuración)"""
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self._path = self._role = None
+        self.ready = False
+        self._pending.clear()
+        self._dirty = False
+        self._reset()
+
+    def _sync(self, path: str) -> str:
+        """
+        Carga el estado si hace falta e incorpora los vuelos encolados; devuelve
+        'ready', 'missing' o 'conflict'. Se llama con el lock tomado.
+        """
+        role = self._claim(path)
+        if role == 'conflict' and self._pending:
+            # Se renueva por si un rebuild la borró mientras este proceso seguía insertando
+            self._mark_conflict(path)
+        if role == 'conflict' or (role == 'owner' and os.path.exists(f'{path}.conflict')):
+            self._pending.clear()
+            return 'conflict'
+        if role != 'owner':
+            self._pending.clear()
+            return 'missing'
+        if not self.ready and self.load(path):
+            self.ready = True
+        if not self.ready:
+            # Sin estado base no se acumula nada: se respondería con conteos parciales
+            self._pending.clear()
+            return 'missing'
+        for id_aerolinea, id_aeropuerto, dia in self._pending:
+            self.add(id_aerolinea, id_aeropuerto, dia.strftime('%Y-%m-%d'))
+        self._dirty = self._dirty or bool(self._pending)
+        self._pending.clear()
+        return 'ready'
+
+    def is_ready(self) -> bool:
+        """
+        True si hay estado para responder en modo aproximado.
+        Lanza SketchConflictError si hay más de un proceso escribiendo vuelos.
+        """
+        path = current_app.config['SKETCH_STATE_PATH']
+        with self._lock:
+            self._target = path
+            status = self._sync(path)
+        if status == 'conflict':
+            raise SketchConflictError("?approx=true requiere un único proceso que inserte vuelos; "
+                                      "hay otro usando los mismos resúmenes (reconstruir con "
+                                      "`flask rebuild-sketches` con los demás procesos detenidos)")
+        return status == 'ready'
+
+    # Actualización
+    def add(self, id_aerolinea: int, id_aeropuerto: int, dia: str) -> None:
+        airline = str(id_aerolinea)
+        self.airports.add(str(id_aeropuerto))
+        self.airlines.add(airline)
+        self.days[dia] += 1
+        hll = self.active_days.get(airline)
+        if hll is None:
+            hll = self.active_days[airline] = HyperLogLog(self.hll_precision)
+        hll.add(dia)
+
+    def apply(self, flights: List[Tuple[int, int, date]]) -> None:
+        """
+        Encola los vuelos (aerolínea, aeropuerto, día) de un commit. Se llama desde
+        el hook after_commit, así que no toca el disco: el hilo de fondo (o la
+        próxima consulta) los incorpora.
+        """
+        config = current_app.config
+        with self._lock:
+            if self._path is not None and self._path != config['SKETCH_STATE_PATH']:
+                self._release()
+            self._target = config['SKETCH_STATE_PATH']
+            self._pending.extend(flights)
+            self._save_interval = config['SKETCH_SAVE_INTERVAL']
+            if self._saver is None:
+                self._saver = threading.Thread(target=self._run_saver, name='sketch-saver', daemon=True)
+                self._saver.start()
+                atexit.register(self.flush)
+        self._wake.set()
+
+    def flush(self) -> None:
+        """Incorpora los vuelos encolados y guarda el estado si cambió"""
+        with self._lock:
+            path = self._target
+            if path is None:
+                return
+            status = self._sync(path)
+            if status != 'ready' or not self._dirty:
+                return
+            state = self.to_dict()
+            self._dirty = False
+        try:
+            self._write(path, state)
+        except OSError as e:
+            logger.warning("No se pudo guardar el estado de los resúmenes: %s", e,
+                           extra={'event': 'sketch.save_failed'})
+            with self._lock:
+                self._dirty = True
+
+    def _run_saver(self) -> None:
+        # Despierta con el primer commit y después guarda como mucho una vez por intervalo
+        while True:
+            self._wake.wait(self._save_interval)
+            self._wake.clear()
+            self.flush()
+            time.sleep(self._save_interval)
+
+    def rebuild(self) -> int:
+        """Reconstruye los resúmenes desde cero con un recorrido completo de flights"""
+        config = current_app.config
+        path = config['SKETCH_STATE_PATH']
+        with self._lock:
+            self._target = path
+            if self._claim(path) == 'conflict':
+                raise SketchConflictError("Otro proceso mantiene los resúmenes; deténgalo para reconstruirlos")
+            self._pending.clear()
+            self._reset(config['SKETCH_TOP_K'], config['SKETCH_HLL_PRECISION'])
+            rows = db.session.query(
+                Flight.id_aerolinea, Flight.id_aeropuerto, Flight.dia
+            ).yield_per(10000)
+            added = 0
+            for id_aerolinea, id_aeropuerto, dia in rows:
+                self.add(id_aerolinea, id_aeropuerto, dia.strftime('%Y-%m-%d'))
+                added += 1
+            self.save(path)
+            try:
+                os.remove(f'{path}.conflict')
+            except FileNotFoundError:
+                pass
+            self.ready = True
+            self._dirty = False
+        return added
+
+    # Consultas aproximadas
+    @staticmethod
+    def _top_with_bounds(sketch: SpaceSaving) -> Optional[Dict]:
+        """Elemento más frecuente con sus cotas de error"""
+        top = sketch.top(2)
+        if not top:
+            return None
+        key, count, error = top[0]
+        runner_up = top[1][1] if len(top) > 1 else 0
+        return {
+            'key': key,
+            'estimate': count,
+            'lower_bound': count - error,
+            'max_error': error,
+            # Si la cota inferior supera al segundo estimado, es el máximo real
+            'guaranteed_top': count - error >= runner_up,
+            'sample_size': sketch.total
+        }
+
+    def _error_bound(self, result: Dict) -> Dict:
+        return {
+            'lower_bound': result['lower_bound'],
+            'max_error': result['max_error'],
+            'guaranteed_top': result['guaranteed_top']
+        }
+
+    def busiest_airport(self) -> Dict:
+        with self._lock:
+            result = self._top_with_bounds(self.airports)
+        if result is None:
+            return {'airport': None, 'total_movements': 0, 'approximate': True}
+        airport = db.session.get(Airport, int(result['key']))
+        return {
+            'airport': airport.nombre_aeropuerto if airport else None,
+            'total_movements': result['estimate'],
+            'approximate': True,
+            'error_bound': self._error_bound(result)
+        }
+
+    def most_active_airline(self) -> Dict:
+        with self._lock:
+            result = self._top_with_bounds(self.airlines)
+        if result is None:
+            return {'airline': None, 'total_flights': 0, 'approximate': True}
+        airline = db.session.get(Airline, int(result['key']))
+        return {
+            'airline': airline.nombre_aerolinea if airline else None,
+            'total_flights': result['estimate'],
+            'approximate': True,
+            'error_bound': self._error_bound(result)
+        }
+
+    def busiest_day(self) -> Dict:
+        with self._lock:
+            best = max(self.days.items(), key=lambda item: item[1], default=None)
+        if best is None:
+            return {'date': None, 'total_flights': 0, 'approximate': True}
+        # Conteo exacto por día: sin error, salvo cambios aún no incorporados
+        day, total = best
+        return {
+            'date': day,
+            'total_flights': total,
+            'approximate': True,
+            'error_bound': {'lower_bound': total, 'max_error': 0, 'guaranteed_top': True}
+        }
+
+    def airline_active_days(self) -> List[Dict]:
+        """Días distintos con vuelos por aerolínea (HyperLogLog)"""
+        names = dict(db.session.query(Airline.id_aerolinea, Airline.nombre_aerolinea).all())
+        with self._lock:
+            estimates = [(key, hll.count(), hll.relative_error) for key, hll in self.active_days.items()]
+        result = []
+        for key, estimate, relative_error in estimates:
+            result.append({
+                'airline': names.get(int(key)),
+                'active_days': estimate,
+                'approximate': True,
+                'error_bound': {
+                    'relative_standard_error': round(relative_error, 4),
+                    # Intervalo de ~95% (dos errores estándar)
+                    'low': max(0, int(estimate * (1 - 2 * relative_error))),
+                    'high': int(round(estimate * (1 + 2 * relative_error)))
+                }
+            })
+        return sorted(result, key=lambda item: item['active_days'], reverse=True)
+
+
+flight_sketches = FlightSketches()
@@ -0,0 +1,384 @@
+# app/services/jobs.py
+
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Tuple
+
+from ..config import INSTANCE_FILES
+from .stackoverflow_service import APIError, ClientRequestError, StackOverflowService, ValidationError
+
+
+class JobError(Exception):
+    """Error al crear un job (nombre o parámetros inválidos)"""
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Jobs disponibles. Se ejecutan en procesos hijos: cada función recibe los
+# parámetros ya validados y un callback report(fracción, mensaje).
+# ---------------------------------------------------------------------------
+
+def validate_flight_report(params: Dict) -> Dict:
+    if params:
+        raise JobError("El job 'flight_report' no recibe parámetros")
+    return {}
+
+
+def run_flight_report(params: Dict, report: Callable[[float, str], None]) -> Dict:
+    """Reporte de toda la historia de vuelos por aerolínea, aeropuerto, mes y movimiento"""
+    from app import db
+    from app.models import Airline, Airport, Flight, Movement
+    from . import flight_analytics
+
+    result = {}
+    steps = 6
+    report(0 / steps, 'Totales')
+    result['total_flights'] = db.session.query(db.func.count(Flight.id)).scalar()
+
+    report(1 / steps, 'Por aerolínea')
+    active_days = {r['airline']: r['active_days'] for r in flight_analytics.get_airline_active_days()}
+    result['by_airline'] = [{
+        'airline': name, 'flights': total, 'active_days': active_days.get(name, 0)
+    } for _, name, total in db.session.query(
+        Airline.id_aerolinea, Airline.nombre_aerolinea, db.func.count(Flight.id)
+    ).join(Flight).group_by(Airline.id_aerolinea, Airline.nombre_aerolinea)
+     .order_by(db.func.count(Flight.id).desc()).all()]
+
+    report(2 / steps, 'Por aeropuerto')
+    result['by_airport'] = [{
+        'airport': name, 'flights': total
+    } for _, name, total in db.session.query(
+        Airport.id_aeropuerto, Airport.nombre_aeropuerto, db.func.count(Flight.id)
+    ).join(Flight).group_by(Airport.id_aeropuerto, Airport.nombre_aeropuerto)
+     .order_by(db.func.count(Flight.id).desc()).all()]
+
+    report(3 / steps, 'Por tipo de movimiento')
+    result['by_movement'] = [{
+        'movement': name, 'flights': total
+    } for _, name, total in db.session.query(
+        Movement.id_movimiento, Movement.descripcion, db.func.count(Flight.id)
+    ).join(Flight).group_by(Movement.id_movimiento, Movement.descripcion).all()]
+
+    report(4 / steps, 'Por día')
+    by_day = db.session.query(Flight.dia, db.func.count(Flight.id)).group_by(Flight.dia).all()
+    result['busiest_day'] = flight_analytics.get_busiest_day()
+    months: Dict[str, int] = {}
+    for dia, total in by_day:
+        month = dia.strftime('%Y-%m')
+        months[month] = months.get(month, 0) + total
+    result['by_month'] = [{'month': month, 'flights': months[month]} for month in sorted(months)]
+
+    report(5 / steps, 'Aerolíneas con más de 2 vuelos por día')
+    result['airlines_multiple_daily'] = flight_analytics.get_airlines_multiple_daily()
+    return result
+
+
+def validate_stack_crawl(params: Dict) -> Dict:
+    allowed = {'query', 'site', 'tags', 'fromdate', 'todate', 'max_pages'}
+    unknown = set(params) - allowed
+    if unknown:
+        raise JobError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+    max_pages = params.get('max_pages', 10)
+    if not isinstance(max_pages, int) or not 1 <= max_pages <= 100:
+        raise JobError("'max_pages' debe ser un entero entre 1 y 100")
+    try:
+        search_params = StackOverflowService().build_search_params(
+            query=params.get('query'),
+            site=params.get('site'),
+            tags=params.get('tags'),
+            fromdate=params.get('fromdate'),
+            todate=params.get('todate')
+        )
+    except ValidationError as e:
+        raise JobError(str(e))
+    return {'search_params': search_params, 'max_pages': max_pages}
+
+
+CRAWL_PAGE_RETRIES = 2
+# Segundos que una página espera a que el límite de tasa de la consulta la deje pasar
+CRAWL_RATE_WAIT = 10
+
+
+def _fetch_page(service: StackOverflowService, search_params: Dict, page: int, backoff: float) -> Dict:
+    """
+    Una página de /search, con el circuit breaker y el límite de tasa del servicio
+    (todas las páginas comparten el límite de la consulta sin paginar).
+    Los errores transitorios (timeout, conexión, 5xx, respuesta inválida) se
+    reintentan esperando al menos el último `backoff`; un 4xx no se reintenta
+    porque la consulta en sí es inválida.
+    """
+    key = service._cache_key(search_params)
+    for attempt in range(CRAWL_PAGE_RETRIES + 1):
+        try:
+            return service.fetch_guarded(dict(search_params, page=page, pagesize=100), key, CRAWL_RATE_WAIT)
+        except ClientRequestError:
+            raise
+        except (APIError, ValidationError):
+            if attempt == CRAWL_PAGE_RETRIES:
+                raise
+            time.sleep(max(backoff, 2 ** attempt))
+
+
+def run_stack_crawl(params: Dict, report: Callable[[float, str], None]) -> Dict:
+    """
+    Recorre varias páginas de /search y calcula el reporte completo sobre todas.
+    Si una página falla después de la primera se devuelve el reporte de las ya
+    obtenidas, con complete=False y el error.
+    """
+    from .stack_analytics import StackAnalytics
+
+    service = StackOverflowService()
+    max_pages = params['max_pages']
+    items = []
+    pages = 0
+    backoff = 0
+    error = None
+    for page in range(1, max_pages + 1):
+        report((page - 1) / max_pages, f'Página {page} de {max_pages}')
+        try:
+            data = _fetch_page(service, params['search_params'], page, backoff)
+        except Exception as e:
+            if not pages:
+                raise
+            error = f'Página {page}: {e}'
+            break
+        items.extend(data.get('items', []))
+        pages = page
+        if not data.get('has_more'):
+            break
+        # La API pide esperar `backoff` segundos antes de la siguiente llamada
+        backoff = data.get('backoff', 0)
+        time.sleep(backoff)
+
+    report(1.0, 'Calculando análisis')
+    result = {
+        'pages_fetched': pages,
+        'total_items': len(items),
+        'complete': error is None,
+        'report': StackAnalytics(items).report()
+    }
+    if error is not None:
+        result['error'] = error
+    return result
+
+
+JOBS: Dict[str, Tuple[Callable, Callable]] = {
+    'flight_report': (validate_flight_report, run_flight_report),
+    'stack_crawl': (validate_stack_crawl, run_stack_crawl)
+}
+
+
+# ---------------------------------------------------------------------------
+# Lado del proceso hijo
+# ---------------------------------------------------------------------------
+
+_worker_app = None
+
+# Configuración que los hijos reciben del proceso web: con spawn solo podrían
+# releerla del entorno y perderían los valores fijados en app.config
+WORKER_CONFIG_KEYS = ('SQLALCHEMY_DATABASE_URI', *INSTANCE_FILES)
+
+
+def _init_worker(config_name: str, overrides: Dict) -> None:
+    """Crea una app por proceso hijo para tener contexto y conexión propios"""
+    global _worker_app
+    from app import create_app
+    _worker_app = create_app(config_name, overrides)
+
+
+def _execute(job_id: str, name: str, params: Dict, progress) -> Dict:
+    def report(fraction: float, message: str) -> None:
+        progress[job_id] = {'state': 'running', 'progress': round(fraction, 3), 'message': message}
+
+    report(0.0, 'Iniciando')
+    with _worker_app.app_context():
+        return JOBS[name][1](params, report)
+
+
+# ---------------------------------------------------------------------------
+# Lado del proceso web
+# ---------------------------------------------------------------------------
+
+class Job:
+    """Estado de un job conocido por el proceso web"""
+
+    def __init__(self, name: str, params: Dict, key: str):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.params = params
+        self.key = key
+        self.state = 'queued'
+        self.result = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self, live: Optional[Dict] = None) -> Dict:
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'params': self.params,
+            'state': self.state,
+            'progress': 1.0 if self.state == 'done' else 0.0,
+            'message': None,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+        if live and self.state in ('queued', 'running'):
+            data.update(live)
+        if self.state == 'done':
+            data['result'] = self.result
+        if self.state == 'failed':
+            data['error'] = self.error
+        return data
+
+
+class JobManager:
+    """
+    Cola de jobs de analytics ejecutados en un pool de procesos.
+    Un job idéntico (mismo nombre y parámetros) que ya esté en cola o corriendo
+    no se vuelve a lanzar: se devuelve el existente.
+    """
+
+    MAX_JOBS_IN_MEMORY = 200
+
+    def __init__(self):
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._active: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._progress = None
+        self._results_dir: Optional[str] = None
+
+    def _ensure_started(self, app) -> None:
+        if self._executor is not None:
+            return
+        # spawn: los hijos no heredan conexiones abiertas ni hilos del proceso web
+        context = multiprocessing.get_context('spawn')
+        if self._progress is None:
+            # El diccionario de progreso se conserva si se recrea el pool
+            self._progress = context.Manager().dict()
+        self._results_dir = app.config['JOB_RESULTS_DIR']
+        self._executor = ProcessPoolExecutor(
+            max_workers=app.config['JOBS_MAX_WORKERS'],
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(app.config['CONFIG_NAME'], {key: app.config[key] for key in WORKER_CONFIG_KEYS})
+        )
+
+    def submit(self, app, name: str, params: Optional[Dict]) -> Tuple[Job, bool]:
+        """Encola un job; devuelve (job, creado) donde creado=False si se deduplicó"""
+        if name not in JOBS:
+            raise JobError(f"Job desconocido '{name}'. Disponibles: {', '.join(sorted(JOBS))}")
+        if params is None:
+            params = {}
+        if not isinstance(params, dict):
+            raise JobError("'params' debe ser un objeto")
+        validated = JOBS[name][0](params)
+        key = json.dumps([name, params], sort_keys=True)
+
+        with self._lock:
+            active_id = self._active.get(key)
+            if active_id is not None:
+                return self._jobs[active_id], False
+
+            self._ensure_started(app)
+            job = Job(name, params, key)
+            executor = self._executor
+            try:
+                future = executor.submit(_execute, job.id, name, validated, self._progress)
+            except BrokenProcessPool:
+                # El pool quedó roto (murió un proceso hijo): se reemplaza por uno nuevo
+                self._discard_executor(executor)
+                self._ensure_started(app)
+                executor = self._executor
+                future = executor.submit(_execute, job.id, name, validated, self._progress)
+            self._jobs[job.id] = job
+            self._active[key] = job.id
+            self._evict()
+        future.add_done_callback(lambda done: self._finish(job, done, executor))
+        return job, True
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        """
+        Olvida un pool roto para que el próximo submit cree otro; se llama con el
+        lock tomado. El pool roto ya terminó sus procesos al detectar la caída.
+        """
+        if self._executor is executor:
+            self._executor = None
+
+    def _finish(self, job: Job, future: Future, executor: ProcessPoolExecutor) -> None:
+        try:
+            job.result = future.result()
+            job.state = 'done'
+        except BrokenProcessPool:
+            # Todos los jobs pendientes del pool roto llegan aquí y quedan como fallidos
+            job.error = "El proceso que ejecutaba el job terminó inesperadamente"
+            job.state = 'failed'
+            with self._lock:
+                self._discard_executor(executor)
+        except Exception as e:
+            job.error = str(e)
+            job.state = 'failed'
+        job.finished_at = time.time()
+        try:
+            self._store(job)
+        except OSError as e:
+            # Sin disco el resultado no sobreviviría a un reinicio: el job se da por fallido
+            job.result = None
+            job.error = f"No se pudo guardar el resultado del job: {e}"
+            job.state = 'failed'
+        with self._lock:
+            self._active.pop(job.key, None)
+        self._progress.pop(job.id, None)
+
+    def _evict(self) -> None:
+        while len(self._jobs) > self.MAX_JOBS_IN_MEMORY:
+            oldest_id = next(iter(self._jobs))
+            if self._jobs[oldest_id].state in ('queued', 'running'):
+                break
+            self._jobs.popitem(last=False)
+
+    def _store(self, job: Job) -> None:
+        """Guarda el resultado en disco para consultarlo aunque se reinicie el proceso"""
+        os.makedirs(self._results_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._results_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as handle:
+                json.dump(job.to_dict(), handle, default=str)
+            os.replace(tmp_path, os.path.join(self._results_dir, f'{job.id}.json'))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def get(self, app, job_id: str) -> Optional[Dict]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            live = self._progress.get(job_id) if self._progress is not None else None
+            if live and job.state == 'queued':
+                job.state = 'running'
+            return job.to_dict(live)
+
+        # Resultado de un job anterior guardado en disco
+        if not job_id.isalnum():
+            return None
+        path = os.path.join(app.config['JOB_RESULTS_DIR'], f'{job_id}.json')
+        try:
+            with open(path) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+
+job_manager = JobManager()
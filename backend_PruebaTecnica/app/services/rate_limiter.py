@@ -0,0 +1,41 @@
+# app/services/rate_limiter.py
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Limitador de tasa tipo token bucket.
+    Permite ráfagas de hasta `capacity` llamadas y repone `rate` llamadas por segundo.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout: float) -> bool:
+        """Como try_acquire, pero espera hasta `timeout` segundos a que se reponga una llamada"""
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire():
+            if self.rate <= 0:
+                return False
+            with self._lock:
+                wait = (1 - self._tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+        return True
@@ -0,0 +1,97 @@
+# app/services/sketches.py
+
+import base64
+import hashlib
+import math
+from typing import Dict, List, Tuple
+
+
+def hash64(value: str) -> int:
+    """Hash estable de 64 bits (no depende de PYTHONHASHSEED, se puede persistir)"""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class SpaceSaving:
+    """
+    Algoritmo Space-Saving para los k elementos más frecuentes.
+
+    Cada contador guarda (conteo, error). El conteo real de un elemento está en
+    [conteo - error, conteo], y el error nunca supera total / k. Si hay menos de
+    k elementos distintos los conteos son exactos.
+    """
+
+    def __init__(self, k: int = 64):
+        self.k = k
+        self.total = 0
+        self.counters: Dict[str, List[int]] = {}
+
+    def add(self, key: str, count: int = 1) -> None:
+        self.total += count
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += count
+        elif len(self.counters) < self.k:
+            self.counters[key] = [count, 0]
+        else:
+            # Reemplaza al elemento de menor conteo y hereda su conteo como error
+            victim = min(self.counters, key=lambda item: self.counters[item][0])
+            minimum = self.counters.pop(victim)[0]
+            self.counters[key] = [minimum + count, minimum]
+
+    def top(self, n: int = 1) -> List[Tuple[str, int, int]]:
+        """Los n elementos con mayor conteo estimado como (clave, conteo, error)"""
+        ranked = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)
+        return [(key, count, error) for key, (count, error) in ranked[:n]]
+
+    def to_dict(self) -> Dict:
+        return {'k': self.k, 'total': self.total, 'counters': self.counters}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'SpaceSaving':
+        sketch = cls(state['k'])
+        sketch.total = state['total']
+        sketch.counters = {key: list(value) for key, value in state['counters'].items()}
+        return sketch
+
+
+class HyperLogLog:
+    """
+    HyperLogLog para contar elementos distintos.
+    Error estándar relativo de 1.04 / sqrt(2^p).
+    """
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, value: str) -> None:
+        x = hash64(value)
+        index = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Corrección para cardinalidades pequeñas (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_dict(self) -> Dict:
+        return {'p': self.p, 'registers': base64.b64encode(bytes(self.registers)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'HyperLogLog':
+        sketch = cls(state['p'])
+        sketch.registers = bytearray(base64.b64decode(state['registers']))
+        return sketch
@@ -0,0 +1,188 @@
+# app/services/stack_analytics.py
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .stack_items import StackItem
+
+SECONDS_PER_DAY = 86400
+PERCENTILES = (50, 90, 99)
+
+
+class ItemColumns:
+    """
+    Representación columnar (NumPy) de los items de Stack Exchange.
+    Los valores faltantes de campos numéricos se guardan como NaN.
+    """
+
+    __slots__ = (
+        'size', 'is_answered', 'score', 'view_count', 'answer_count',
+        'reputation', 'creation_date', 'title', 'link', 'author',
+        'tag_vocabulary', 'tag_codes', 'tag_item'
+    )
+
+    def __init__(self, items: Sequence[Union[StackItem, Dict]]):
+        items = [item if isinstance(item, StackItem) else StackItem.from_dict(item) for item in items]
+        n = len(items)
+        self.size = n
+
+        def numeric(values) -> np.ndarray:
+            # None se convierte en NaN al construir un arreglo float
+            return np.array(list(values), dtype=np.float64).reshape(n)
+
+        self.is_answered = np.array([item.is_answered for item in items], dtype=bool)
+        self.score = numeric(item.score for item in items)
+        self.view_count = numeric(item.view_count for item in items)
+        self.answer_count = numeric(item.answer_count for item in items)
+        self.creation_date = numeric(item.creation_date for item in items)
+        self.reputation = numeric(item.reputation for item in items)
+        self.title: List[Optional[str]] = [item.title for item in items]
+        self.link: List[Optional[str]] = [item.link for item in items]
+        self.author: List[Optional[str]] = [item.display_name for item in items]
+
+        item_tags = [item.tags for item in items]
+        tags: List[str] = [tag for group in item_tags for tag in group]
+        tag_counts = np.array([len(group) for group in item_tags], dtype=np.int64)
+
+        if tags:
+            self.tag_vocabulary, self.tag_codes = np.unique(np.asarray(tags), return_inverse=True)
+        else:
+            self.tag_vocabulary = np.asarray([], dtype=str)
+            self.tag_codes = np.zeros(0, dtype=np.int64)
+        self.tag_item = np.repeat(np.arange(n), tag_counts)
+
+
+def _to_int(value: float) -> Optional[int]:
+    return None if np.isnan(value) else int(value)
+
+
+def _format_timestamp(value: float) -> str:
+    return datetime.fromtimestamp(0 if np.isnan(value) else int(value)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class StackAnalytics:
+    """
+    Métricas sobre los items de Stack Exchange calculadas con operaciones vectorizadas.
+    Reproduce las métricas de StackOverflowService y agrega percentiles,
+    tasa de respuesta por tag e histograma de actividad diaria.
+    """
+
+    def __init__(self, items: Sequence[Union[StackItem, Dict]]):
+        self.columns = ItemColumns(items)
+
+    def statistics(self) -> Dict:
+        total = self.columns.size
+        answered = int(np.count_nonzero(self.columns.is_answered))
+        return {
+            'total_questions': total,
+            'answered': answered,
+            'unanswered': total - answered,
+            'answer_rate': round((answered / total * 100), 2) if total > 0 else 0
+        }
+
+    def highest_reputation(self) -> Optional[Dict]:
+        c = self.columns
+        if not c.size:
+            return None
+        i = int(np.argmax(np.nan_to_num(c.reputation, nan=0)))
+        return {
+            'title': c.title[i],
+            'author': c.author[i],
+            'reputation': _to_int(c.reputation[i]),
+            'score': _to_int(c.score[i]),
+            'link': c.link[i]
+        }
+
+    def least_viewed(self) -> Optional[Dict]:
+        c = self.columns
+        if not c.size:
+            return None
+        i = int(np.argmin(np.nan_to_num(c.view_count, nan=np.inf)))
+        return {
+            'title': c.title[i],
+            'views': _to_int(c.view_count[i]),
+            'link': c.link[i],
+            'created_at': _format_timestamp(c.creation_date[i])
+        }
+
+    def timeline(self) -> Dict:
+        c = self.columns
+        if not c.size:
+            return {'oldest': None, 'newest': None}
+        oldest = int(np.argmin(np.nan_to_num(c.creation_date, nan=np.inf)))
+        newest = int(np.argmax(np.nan_to_num(c.creation_date, nan=0)))
+
+        def format_answer(i: int) -> Dict:
+            return {
+                'title': c.title[i],
+                'created_at': _format_timestamp(c.creation_date[i]),
+                'link': c.link[i],
+                'score': _to_int(c.score[i])
+            }
+
+        return {'oldest': format_answer(oldest), 'newest': format_answer(newest)}
+
+    def percentiles(self, percentiles: Sequence[int] = PERCENTILES) -> Dict[str, Dict]:
+        """Percentiles y media de score, vistas, respuestas y reputación"""
+        c = self.columns
+        result = {}
+        for name, column in (('score', c.score), ('view_count', c.view_count),
+                             ('answer_count', c.answer_count), ('reputation', c.reputation)):
+            values = column[~np.isnan(column)]
+            if not values.size:
+                result[name] = None
+                continue
+            points = np.percentile(values, percentiles)
+            summary = {f'p{p}': round(float(v), 2) for p, v in zip(percentiles, points)}
+            summary['mean'] = round(float(values.mean()), 2)
+            summary['max'] = float(values.max())
+            result[name] = summary
+        return result
+
+    def tag_answer_rates(self, limit: Optional[int] = None) -> List[Dict]:
+        """Preguntas y tasa de respuesta por tag, ordenadas por número de preguntas"""
+        c = self.columns
+        vocabulary_size = len(c.tag_vocabulary)
+        if not vocabulary_size:
+            return []
+        totals = np.bincount(c.tag_codes, minlength=vocabulary_size)
+        answered = np.bincount(
+            c.tag_codes, weights=c.is_answered[c.tag_item], minlength=vocabulary_size
+        ).astype(np.int64)
+        rates = np.round(answered / totals * 100, 2)
+        order = np.argsort(-totals, kind='stable')[:limit]
+        return [{
+            'tag': str(c.tag_vocabulary[i]),
+            'questions': int(totals[i]),
+            'answered': int(answered[i]),
+            'answer_rate': float(rates[i])
+        } for i in order]
+
+    def daily_activity(self) -> List[Dict]:
+        """Histograma de preguntas creadas (y contestadas) por día UTC"""
+        c = self.columns
+        valid = ~np.isnan(c.creation_date)
+        if not valid.any():
+            return []
+        days = (c.creation_date[valid] // SECONDS_PER_DAY).astype(np.int64)
+        unique_days, inverse, counts = np.unique(days, return_inverse=True, return_counts=True)
+        answered = np.bincount(inverse, weights=c.is_answered[valid]).astype(np.int64)
+        return [{
+            'date': datetime.fromtimestamp(int(day) * SECONDS_PER_DAY, tz=timezone.utc).strftime('%Y-%m-%d'),
+            'questions': int(count),
+            'answered': int(answered_count)
+        } for day, count, answered_count in zip(unique_days, counts, answered)]
+
+    def report(self, tag_limit: Optional[int] = 20) -> Dict:
+        """Todas las métricas en un solo diccionario"""
+        return {
+            'statistics': self.statistics(),
+            'highest_reputation': self.highest_reputation(),
+            'least_viewed': self.least_viewed(),
+            'timeline': self.timeline(),
+            'percentiles': self.percentiles(),
+            'tags': self.tag_answer_rates(limit=tag_limit),
+            'daily_activity': self.daily_activity()
+        }
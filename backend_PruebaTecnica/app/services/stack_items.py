@@ -0,0 +1,171 @@
+# app/services/stack_items.py
+
+import codecs
+import json
+import sys
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class StackItem:
+    """
+    Item de Stack Exchange con solo los campos que usan los análisis.
+    Con __slots__ no hay __dict__ por instancia; el dueño se guarda aplanado
+    (reputation, display_name) y los tags se internan porque se repiten mucho.
+    """
+
+    __slots__ = ('title', 'link', 'is_answered', 'score', 'view_count',
+                 'answer_count', 'creation_date', 'tags', 'reputation', 'display_name')
+
+    def __init__(self, title: Optional[str] = None, link: Optional[str] = None,
+                 is_answered: bool = False, score: Optional[int] = None,
+                 view_count: Optional[int] = None, answer_count: Optional[int] = None,
+                 creation_date: Optional[int] = None, tags: Tuple[str, ...] = (),
+                 reputation: Optional[int] = None, display_name: Optional[str] = None):
+        self.title = title
+        self.link = link
+        self.is_answered = is_answered
+        self.score = score
+        self.view_count = view_count
+        self.answer_count = answer_count
+        self.creation_date = creation_date
+        self.tags = tags
+        self.reputation = reputation
+        self.display_name = display_name
+
+    @classmethod
+    def from_dict(cls, item: Dict) -> 'StackItem':
+        owner = item.get('owner') or {}
+        return cls(
+            title=item.get('title'),
+            link=item.get('link'),
+            is_answered=bool(item.get('is_answered', False)),
+            score=item.get('score'),
+            view_count=item.get('view_count'),
+            answer_count=item.get('answer_count'),
+            creation_date=item.get('creation_date'),
+            tags=tuple(sys.intern(tag) for tag in item.get('tags') or ()),
+            reputation=owner.get('reputation'),
+            display_name=owner.get('display_name')
+        )
+
+    def to_dict(self) -> Dict:
+        """Item con la forma de la API (sin campos vacíos), p. ej. para el snapshot en disco"""
+        data = {'is_answered': self.is_answered, 'tags': list(self.tags)}
+        for field in ('title', 'link', 'score', 'view_count', 'answer_count', 'creation_date'):
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        owner = {field: value for field, value in (('reputation', self.reputation),
+                                                   ('display_name', self.display_name))
+                 if value is not None}
+        if owner:
+            data['owner'] = owner
+        return data
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, StackItem):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"StackItem(title={self.title!r}, creation_date={self.creation_date!r})"
+
+
+class _ChunkReader:
+    """
+    Buffer de texto sobre un iterable de bloques de bytes. Decodifica valores JSON
+    uno a uno con raw_decode, leyendo más bloques solo cuando el valor está incompleto.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._exhausted = False
+
+    def _read_more(self) -> bool:
+        if self._exhausted:
+            return False
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                # Lo ya consumido se descarta: el buffer solo guarda el valor en curso
+                self._buffer = self._buffer[self._pos:] + text
+                self._pos = 0
+                return True
+        self._buffer += self._decoder.decode(b'', final=True)
+        self._exhausted = True
+        return False
+
+    def peek(self) -> str:
+        """Siguiente carácter que no es espacio (sin consumirlo); '' al final"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in ' \t\n\r':
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_more():
+                return ''
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"JSON inválido: se esperaba '{char}'")
+        self._pos += 1
+
+    def value(self):
+        """Decodifica el siguiente valor JSON completo"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._read_more():
+                    continue
+                raise
+            # Un número al final del buffer puede seguir en el próximo bloque
+            if end == len(self._buffer) and self._read_more():
+                continue
+            self._pos = end
+            return value
+
+
+def parse_search_response(chunks: Iterable[bytes]) -> Dict:
+    """
+    Parsea de forma incremental la respuesta de /search. Cada elemento de
+    'items' se convierte en StackItem apenas se termina de leer, así nunca se
+    tiene en memoria el cuerpo completo ni el árbol de dicts de todos los items.
+    """
+    reader = _ChunkReader(chunks)
+    data: Dict = {}
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.expect('}')
+        return data
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError("JSON inválido: se esperaba una clave")
+        reader.expect(':')
+        if key == 'items' and reader.peek() == '[':
+            reader.expect('[')
+            items = []
+            if reader.peek() != ']':
+                while True:
+                    item = reader.value()
+                    if not isinstance(item, dict):
+                        raise ValueError("Datos de items inválidos")
+                    items.append(StackItem.from_dict(item))
+                    if reader.peek() != ',':
+                        break
+                    reader.expect(',')
+            reader.expect(']')
+            data['items'] = items
+        else:
+            data[key] = reader.value()
+        if reader.peek() != ',':
+            break
+        reader.expect(',')
+    reader.expect('}')
+    return data
@@ -0,0 +1,63 @@
+# app/services/stack_snapshot.py
+
+import gzip
+import json
+import os
+import tempfile
+from typing import Dict, List, Union
+
+from .stack_items import StackItem
+
+SNAPSHOT_VERSION = 1
+
+
+def compact_item(item: Union[StackItem, Dict]) -> Dict:
+    """Copia de un item con solo los campos usados por los análisis"""
+    if not isinstance(item, StackItem):
+        item = StackItem.from_dict(item)
+    return item.to_dict()
+
+
+def save_snapshot(path: str, entries: List[Dict]) -> None:
+    """
+    Guarda las consultas como JSON comprimido con gzip. La escritura es atómica:
+    se escribe un archivo temporal en el mismo directorio y se reemplaza con os.replace,
+    así un lector nunca ve un archivo a medio escribir.
+    """
+    payload = {
+        'version': SNAPSHOT_VERSION,
+        'entries': [{
+            'params': entry['params'],
+            'fetched_at': entry['fetched_at'],
+            'items': [compact_item(item) for item in entry['data'].get('items', [])]
+        } for entry in entries]
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.stack-snapshot-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as handle:
+            handle.write(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_snapshot(path: str) -> List[Dict]:
+    """Lee las consultas guardadas; devuelve una lista vacía si no hay archivo válido"""
+    try:
+        with gzip.open(path, 'rb') as handle:
+            payload = json.loads(handle.read().decode('utf-8'))
+    except (OSError, ValueError):
+        return []
+    if not isinstance(payload, dict) or payload.get('version') != SNAPSHOT_VERSION:
+        return []
+    try:
+        return [{
+            'params': entry['params'],
+            'fetched_at': entry['fetched_at'],
+            'data': {'items': [StackItem.from_dict(item) for item in entry['items']]}
+        } for entry in payload.get('entries', [])]
+    except (KeyError, TypeError, AttributeError):
+        return []
@@ -1,10 +1,21 @@
 # app/services/stackoverflow_service.py
 
 import requests
-from datetime import datetime
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
 from functools import wraps
 import logging
+import threading
+import time
+
+from .circuit_breaker import CircuitBreaker
+from .rate_limiter import TokenBucket
+from .stack_snapshot import load_snapshot, save_snapshot
+from .stack_analytics import StackAnalytics
+from .stack_items import parse_search_response
 
 class StackOverflowService:
     """
@@ -180,10 +191,14 @@ class StackOverflowService:
 
 
     
-    # Configurar logging
-logging.basicConfig(level=logging.INFO)
+# Los registros salen por la cola del logger 'app' (ver app/structured_logging.py)
 logger = logging.getLogger(__name__)
 
+# Snapshots de datos activos en el contexto actual, por consulta (ver StackOverflowService.snapshot)
+_active_snapshot: ContextVar[Optional[Dict[Tuple, Dict]]] = ContextVar('stack_snapshot', default=None)
+# Antigüedad en segundos de los datos servidos en el contexto actual
+_data_age: ContextVar[Optional[float]] = ContextVar('stack_data_age', default=None)
+
 def handle_api_errors(func):
     """Decorador para manejar errores de API de manera consistente"""
     @wraps(func)
@@ -191,13 +206,16 @@ def handle_api_errors(func):
         try:
             return func(*args, **kwargs)
         except requests.RequestException as e:
-            logger.error(f"Error de API en {func.__name__}: {str(e)}")
+            logger.error("Error de API en %s: %s", func.__name__, e,
+                         extra={'event': 'stack.api_error', 'method': func.__name__})
             raise APIError(f"Error al comunicarse con Stack Exchange: {str(e)}")
         except ValueError as e:
-            logger.error(f"Error de validación en {func.__name__}: {str(e)}")
+            logger.error("Error de validación en %s: %s", func.__name__, e,
+                         extra={'event': 'stack.validation_error', 'method': func.__name__})
             raise ValidationError(str(e))
         except Exception as e:
-            logger.error(f"Error inesperado en {func.__name__}: {str(e)}")
+            logger.error("Error inesperado en %s: %s", func.__name__, e,
+                         extra={'event': 'stack.service_error', 'method': func.__name__})
             raise ServiceError(f"Error interno del servicio: {str(e)}")
     return wrapper
 
@@ -205,6 +223,10 @@ class APIError(Exception):
     """Error específico para problemas de API"""
     pass
 
+class ClientRequestError(APIError):
+    """La API rechazó la consulta (4xx): el servicio responde, no cuenta para el circuit breaker"""
+    pass
+
 class ValidationError(Exception):
     """Error específico para problemas de validación"""
     pass
@@ -214,6 +236,12 @@ class ServiceError(Exception):
     pass
 
 class StackOverflowService:
+    # Valores permitidos para los parámetros de búsqueda
+    SORT_OPTIONS = ('activity', 'votes', 'creation', 'relevance')
+    ORDER_OPTIONS = ('asc', 'desc')
+    MAX_CACHE_ENTRIES = 128
+    STREAM_CHUNK_SIZE = 64 * 1024
+
     def __init__(self):
         self.base_url = "https://api.stackexchange.com/2.2"
         self.search_params = {
@@ -224,6 +252,59 @@ class StackOverflowService:
         }
         self.cache = {}
         self.cache_duration = 300  # 5 minutos en segundos
+        self.circuit_breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        # Límite de llamadas a la API por consulta: ráfaga de 5, luego 1 cada 6 segundos
+        self.rate_limit = (1 / 6, 5)
+        self._rate_limiters: Dict[Tuple, TokenBucket] = {}
+        self._fetch_locks: Dict[Tuple, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # Hilos que obtuvieron cada candado o limitador y todavía lo usan, por (registro, consulta)
+        self._key_users: Dict[Tuple[int, Tuple], int] = {}
+        self._persist_lock = threading.Lock()
+        self.snapshot_path: Optional[str] = None
+        self._analytics = None
+
+    def build_search_params(self, query: Optional[str] = None, site: Optional[str] = None,
+                            tags: Optional[List[str]] = None, fromdate: Optional[str] = None,
+                            todate: Optional[str] = None, sort: Optional[str] = None,
+                            order: Optional[str] = None) -> Dict:
+        """
+        Construye los parámetros de /search a partir de los valores por defecto.
+        Las fechas se reciben como YYYY-MM-DD y se envían como epoch UTC.
+        """
+        params = dict(self.search_params)
+        if query is not None:
+            if not query.strip():
+                raise ValidationError("El parámetro 'query' no puede estar vacío")
+            params['intitle'] = query.strip()
+        if site is not None:
+            if not site.replace('.', '').isalnum():
+                raise ValidationError(f"Sitio inválido: {site}")
+            params['site'] = site
+        if tags:
+            params['tagged'] = ';'.join(tag.strip() for tag in tags if tag.strip())
+        if sort is not None:
+            if sort not in self.SORT_OPTIONS:
+                raise ValidationError(f"Orden inválido: {sort}")
+            params['sort'] = sort
+        if order is not None:
+            if order not in self.ORDER_OPTIONS:
+                raise ValidationError(f"Dirección de orden inválida: {order}")
+            params['order'] = order
+        for name, value in (('fromdate', fromdate), ('todate', todate)):
+            if value is not None:
+                try:
+                    day = datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+                except ValueError:
+                    raise ValidationError(f"Fecha inválida en '{name}', se espera YYYY-MM-DD")
+                params[name] = int(day.timestamp())
+        if 'fromdate' in params and 'todate' in params and params['fromdate'] > params['todate']:
+            raise ValidationError("'fromdate' debe ser anterior a 'todate'")
+        return params
+
+    @staticmethod
+    def _cache_key(params: Dict) -> Tuple:
+        return tuple(sorted(params.items()))
 
     def validate_response(self, data: Dict) -> None:
         """Valida la respuesta de la API"""
@@ -234,24 +315,254 @@ class StackOverflowService:
         if not isinstance(data['items'], list):
             raise ValidationError("Datos de items inválidos")
 
-    @handle_api_errors
-    def _get_data(self) -> Dict:
-        """Obtiene datos de la API con validación"""
+    @contextmanager
+    def snapshot(self, params: Optional[Dict] = None, data: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Fija un único conjunto de datos para todas las llamadas hechas dentro del bloque,
+        de modo que varios métodos de análisis compartan una sola consulta a la API.
+        """
+        params = params or self.search_params
+        if data is None:
+            data = self._get_data(params)
+        snapshots = dict(_active_snapshot.get() or {})
+        snapshots[self._cache_key(params)] = data
+        token = _active_snapshot.set(snapshots)
+        try:
+            yield data
+        finally:
+            _active_snapshot.reset(token)
+
+    def _fetch_data(self, params: Dict) -> Dict:
+        """Consulta la API de Stack Exchange y valida la respuesta"""
         try:
             response = requests.get(
                 f"{self.base_url}/search",
-                params=self.search_params,
-                timeout=10  # Timeout de 10 segundos
+                params=params,
+                timeout=10,  # Timeout de 10 segundos
+                stream=True
             )
-            response.raise_for_status()
-            data = response.json()
+            try:
+                response.raise_for_status()
+                # Los items se convierten a StackItem a medida que llega el cuerpo
+                data = parse_search_response(response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE))
+            except ValueError:
+                raise ValidationError("Respuesta inválida de la API")
+            finally:
+                response.close()
             self.validate_response(data)
+            self.log_api_call('search', data)
             return data
         except requests.Timeout:
             raise APIError("Timeout al conectar con Stack Exchange")
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            # 4xx es un problema de la consulta (p. ej. ?site= inexistente); 429 sí indica sobrecarga
+            if status is not None and 400 <= status < 500 and status != 429:
+                raise ClientRequestError(f"Stack Exchange rechazó la consulta ({status})")
+            raise APIError(f"Error de Stack Exchange: {str(e)}")
         except requests.RequestException as e:
             raise APIError(f"Error de conexión: {str(e)}")
 
+    def _per_key(self, registry: Dict, key: Tuple, factory):
+        """
+        Candado o limitador de una consulta (se crea si no existe). Quien lo obtiene
+        queda como usuario hasta llamar a _release_key: mientras tanto _discard_key no
+        lo quita, porque otro hilo crearía uno nuevo para la misma consulta.
+        """
+        with self._locks_guard:
+            value = registry.get(key)
+            if value is None:
+                if len(registry) >= self.MAX_CACHE_ENTRIES:
+                    for stale_key in [item for item in registry if item not in self.cache]:
+                        self._discard_key(registry, stale_key)
+                value = registry[key] = factory()
+            user = (id(registry), key)
+            self._key_users[user] = self._key_users.get(user, 0) + 1
+            return value
+
+    def _release_key(self, registry: Dict, key: Tuple) -> None:
+        with self._locks_guard:
+            user = (id(registry), key)
+            remaining = self._key_users.pop(user) - 1
+            if remaining:
+                self._key_users[user] = remaining
+
+    @contextmanager
+    def _using_key(self, registry: Dict, key: Tuple, factory) -> Iterator:
+        """_per_key y _release_key alrededor de un bloque"""
+        value = self._per_key(registry, key, factory)
+        try:
+            yield value
+        finally:
+            self._release_key(registry, key)
+
+    def _discard_key(self, registry: Dict, key: Tuple) -> None:
+        """Quita el candado o limitador de una consulta si nadie lo usa; requiere _locks_guard"""
+        if (id(registry), key) not in self._key_users:
+            registry.pop(key, None)
+
+    def _forget(self, key: Tuple) -> None:
+        """Descarta el estado por consulta de una entrada que sale de la caché"""
+        with self._locks_guard:
+            self._discard_key(self._fetch_locks, key)
+            self._discard_key(self._rate_limiters, key)
+
+    def _serve_cached(self, entry: Dict) -> Dict:
+        """Devuelve los datos de una entrada de caché y registra su antigüedad"""
+        _data_age.set(max(0.0, time.time() - entry['fetched_at']))
+        return entry['data']
+
+    def data_age(self) -> Optional[float]:
+        """Antigüedad (segundos) de los datos usados en la petición actual"""
+        return _data_age.get()
+
+    def reset_data_age(self) -> None:
+        _data_age.set(None)
+
+    @handle_api_errors
+    def _get_data(self, params: Optional[Dict] = None) -> Dict:
+        """
+        Obtiene datos de la API con validación.
+        Cada consulta (combinación de parámetros) tiene su propia caché y su propio
+        límite de tasa. Si la caché está vencida se devuelve de inmediato y se
+        refresca en segundo plano, de modo que una caída de la API (o un arranque
+        con datos cargados de disco) no bloquea ni falla las peticiones.
+        """
+        params = params or self.search_params
+        key = self._cache_key(params)
+        snapshot = (_active_snapshot.get() or {}).get(key)
+        if snapshot is not None:
+            return snapshot
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            stale = time.time() - entry['fetched_at'] >= self.cache_duration
+            if stale:
+                self._refresh_in_background(params, key)
+            logger.info("Caché de Stack Exchange: %s", 'stale' if stale else 'hit',
+                        extra={'event': 'stack.cache', 'outcome': 'stale' if stale else 'hit'})
+            return self._serve_cached(entry)
+
+        # Sin datos: una sola llamada a la API por consulta aunque lleguen varias peticiones
+        with self._using_key(self._fetch_locks, key, threading.Lock) as lock, lock:
+            entry = self.cache.get(key)
+            if entry is not None:
+                return self._serve_cached(entry)
+            logger.info("Caché de Stack Exchange: miss", extra={'event': 'stack.cache', 'outcome': 'miss'})
+            data = self._refresh(params, key)
+            _data_age.set(0.0)
+            return data
+
+    def fetch_guarded(self, params: Dict, key: Optional[Tuple] = None, wait: float = 0) -> Dict:
+        """
+        Consulta la API sin caché, respetando el circuit breaker y el límite de tasa
+        de la consulta `key` (por defecto, la de `params`). Con `wait` se espera
+        hasta esos segundos a que el límite deje pasar la llamada.
+        """
+        key = key if key is not None else self._cache_key(params)
+        # El límite se revisa antes: allow_request() puede dejar pasar la llamada de prueba
+        # (half_open) y esa llamada tiene que terminar registrando éxito o fallo
+        with self._using_key(self._rate_limiters, key, lambda: TokenBucket(*self.rate_limit)) as limiter:
+            admitted = limiter.acquire(wait)
+        if not admitted:
+            raise APIError("Límite de consultas a Stack Exchange excedido")
+        if not self.circuit_breaker.allow_request():
+            raise APIError("Stack Exchange no disponible (circuito abierto)")
+
+        try:
+            data = self._fetch_data(params)
+        except ClientRequestError:
+            # El servicio respondió: los errores del cliente no abren el circuito para todos
+            self.circuit_breaker.record_success()
+            raise
+        except Exception:
+            # Cualquier otro error (también los inesperados al convertir items) es un fallo
+            self.circuit_breaker.record_failure()
+            raise
+        self.circuit_breaker.record_success()
+        return data
+
+    def _refresh(self, params: Dict, key: Tuple) -> Dict:
+        """Consulta la API (ver fetch_guarded) y guarda el resultado en caché y en disco"""
+        data = self.fetch_guarded(params, key)
+        if len(self.cache) >= self.MAX_CACHE_ENTRIES and key not in self.cache:
+            oldest = min(self.cache, key=lambda item: self.cache[item]['fetched_at'])
+            self.cache.pop(oldest, None)
+            self._forget(oldest)
+        self.cache[key] = {'params': dict(params), 'data': data, 'fetched_at': time.time()}
+        self._persist()
+        return data
+
+    def _refresh_in_background(self, params: Dict, key: Tuple) -> None:
+        """Lanza un refresco de la consulta si no hay otro en curso"""
+        lock = self._per_key(self._fetch_locks, key, threading.Lock)
+        if not lock.acquire(blocking=False):
+            self._release_key(self._fetch_locks, key)
+            return
+
+        def run():
+            try:
+                self._refresh(params, key)
+            except Exception as e:
+                logger.warning("No se pudo refrescar datos de Stack Exchange: %s", e,
+                               extra={'event': 'stack.refresh_failed'})
+            finally:
+                lock.release()
+                self._release_key(self._fetch_locks, key)
+
+        threading.Thread(target=run, name='stack-refresh', daemon=True).start()
+
+    def init_app(self, app) -> None:
+        """Configura el snapshot en disco y carga el último guardado, si existe"""
+        self.snapshot_path = app.config.get('STACK_SNAPSHOT_PATH')
+        if not self.snapshot_path:
+            return
+        loaded = 0
+        for entry in load_snapshot(self.snapshot_path):
+            try:
+                self.validate_response(entry['data'])
+            except ValidationError:
+                continue
+            key = self._cache_key(entry['params'])
+            if key not in self.cache:
+                self.cache[key] = entry
+                loaded += 1
+        if loaded:
+            logger.info("Snapshot de Stack Exchange cargado: %d consultas", loaded,
+                        extra={'event': 'stack.snapshot_loaded', 'queries': loaded})
+
+    def _persist(self) -> None:
+        """Guarda en disco la última versión válida de cada consulta"""
+        if not self.snapshot_path:
+            return
+        try:
+            with self._persist_lock:
+                save_snapshot(self.snapshot_path, list(self.cache.values()))
+        except OSError as e:
+            logger.warning("No se pudo guardar el snapshot de Stack Exchange: %s", e,
+                           extra={'event': 'stack.snapshot_failed'})
+
+    def compare_queries(self, param_sets: List[Dict]) -> List[Dict]:
+        """
+        Obtiene varias consultas en paralelo y devuelve sus estadísticas
+        lado a lado (p. ej. perl vs python). Cada hilo corre en una copia del
+        contexto actual (snapshot activo, contexto de la app) como en BatchExecutor.
+        """
+        with ThreadPoolExecutor(max_workers=len(param_sets)) as executor:
+            futures = [executor.submit(copy_context().run, self._get_data, params) for params in param_sets]
+            results = []
+            for params, future in zip(param_sets, futures):
+                try:
+                    analytics = StackAnalytics(future.result().get('items', []))
+                    results.append({
+                        'query': params,
+                        'statistics': analytics.statistics(),
+                        'tags': analytics.tag_answer_rates(limit=5)
+                    })
+                except Exception as e:
+                    results.append({'query': params, 'error': str(e)})
+        return results
+
     def validate_statistics(self, stats: Dict) -> None:
         """Valida las estadísticas calculadas"""
         required_fields = ['total_questions', 'answered', 'unanswered', 'answer_rate']
@@ -262,30 +573,23 @@ class StackOverflowService:
         if stats['answered'] + stats['unanswered'] != stats['total_questions']:
             raise ValidationError("Inconsistencia en las estadísticas")
 
+    def _get_analytics(self, params: Optional[Dict] = None) -> StackAnalytics:
+        """
+        Construye las columnas NumPy de los items actuales.
+        Se reutilizan mientras los datos sean los mismos (snapshot o caché).
+        """
+        data = self._get_data(params)
+        cached = self._analytics
+        if cached is not None and cached[0] is data:
+            return cached[1]
+        analytics = StackAnalytics(data.get('items', []))
+        self._analytics = (data, analytics)
+        return analytics
+
     @handle_api_errors
-    def get_answer_statistics(self) -> Dict[str, int]:
+    def get_answer_statistics(self, params: Optional[Dict] = None) -> Dict[str, int]:
         """Obtiene estadísticas con validación"""
-        data = self._get_data()
-        items = data.get('items', [])
-        
-        if not items:
-            return {
-                'total_questions': 0,
-                'answered': 0,
-                'unanswered': 0,
-                'answer_rate': 0
-            }
-        
-        total = len(items)
-        answered = sum(1 for item in items if item.get('is_answered', False))
-        
-        stats = {
-            'total_questions': total,
-            'answered': answered,
-            'unanswered': total - answered,
-            'answer_rate': round((answered / total * 100), 2) if total > 0 else 0
-        }
-        
+        stats = self._get_analytics(params).statistics()
         self.validate_statistics(stats)
         return stats
 
@@ -297,29 +601,97 @@ class StackOverflowService:
                 raise ValidationError(f"Campo requerido faltante en respuesta: {field}")
 
     @handle_api_errors
-    def get_highest_reputation_answer(self) -> Optional[Dict]:
+    def get_highest_reputation_answer(self, params: Optional[Dict] = None) -> Optional[Dict]:
         """Obtiene respuesta con mayor reputación con validación"""
-        data = self._get_data()
-        items = data.get('items', [])
-        
-        if not items:
-            return None
-            
-        highest_rep = max(items, key=lambda x: x.get('owner', {}).get('reputation', 0))
-        
-        answer = {
-            'title': highest_rep.get('title'),
-            'author': highest_rep.get('owner', {}).get('display_name'),
-            'reputation': highest_rep.get('owner', {}).get('reputation'),
-            'score': highest_rep.get('score'),
-            'link': highest_rep.get('link')
-        }
-        
-        self.validate_answer(answer)
+        answer = self._get_analytics(params).highest_reputation()
+        if answer is not None:
+            self.validate_answer(answer)
         return answer
 
+    @handle_api_errors
+    def get_least_viewed_answer(self, params: Optional[Dict] = None) -> Optional[Dict]:
+        """Obtiene la respuesta con menor número de vistas"""
+        answer = self._get_analytics(params).least_viewed()
+        if answer is not None:
+            self.validate_answer(answer)
+        return answer
+
+    @handle_api_errors
+    def get_answer_timeline(self, params: Optional[Dict] = None) -> Dict:
+        """Obtiene las respuestas más antigua y más reciente"""
+        return self._get_analytics(params).timeline()
+
+    @handle_api_errors
+    def get_analytics_report(self, params: Optional[Dict] = None) -> Dict:
+        """
+        Obtiene todas las métricas de una sola vez: las existentes más
+        percentiles, tasa de respuesta por tag y actividad diaria.
+        """
+        report = self._get_analytics(params).report()
+        self.validate_statistics(report['statistics'])
+        for answer in (report['highest_reputation'], report['least_viewed']):
+            if answer is not None:
+                self.validate_answer(answer)
+        return report
+
+    def print_analytics(self, report: Optional[Dict] = None) -> None:
+        """
+        Imprime los análisis en la consola, en una sola escritura.
+        Solo se usa para depurar (STACK_CONSOLE_REPORT).
+        """
+        try:
+            if report is None:
+                report = self.get_analytics_report()
+            stats = report['statistics']
+            high_rep = report['highest_reputation']
+            least_viewed = report['least_viewed']
+            timeline = report['timeline']
+
+            lines = [
+                "\n=== Estadísticas de Stack Overflow ===",
+                f"\nTotal de preguntas: {stats['total_questions']}",
+                f"Contestadas: {stats['answered']}",
+                f"Sin contestar: {stats['unanswered']}",
+                f"Tasa de respuesta: {stats['answer_rate']}%"
+            ]
+
+            if high_rep:
+                lines += [
+                    "\nRespuesta con mayor reputación:",
+                    f"Título: {high_rep['title']}",
+                    f"Autor: {high_rep['author']}",
+                    f"Reputación: {high_rep['reputation']}"
+                ]
+
+            if least_viewed:
+                lines += [
+                    "\nRespuesta menos vista:",
+                    f"Título: {least_viewed['title']}",
+                    f"Vistas: {least_viewed['views']}",
+                    f"Creada: {least_viewed['created_at']}"
+                ]
+
+            if timeline['oldest'] and timeline['newest']:
+                lines += [
+                    "\nLínea de tiempo:",
+                    f"Más antigua: {timeline['oldest']['created_at']}",
+                    f"Más reciente: {timeline['newest']['created_at']}"
+                ]
+
+            print('\n'.join(lines))
+
+        except Exception as e:
+            logger.warning("Error al imprimir analytics: %s", e, extra={'event': 'stack.print_failed'})
+
     def log_api_call(self, method_name: str, response: Dict) -> None:
-        """Registra las llamadas a la API"""
-        logger.info(f"API Call - Method: {method_name}")
-        logger.info(f"Response Status: success")
-        logger.info(f"Response Data Size: {len(str(response))} bytes")
\ No newline at end of file
+        """
+        Registra las llamadas a la API (evento 'stack.api_call'). No se muestrea por
+        defecto: es un registro por consulta real y lleva quota_remaining.
+        """
+        logger.info("API Call - Method: %s", method_name, extra={
+            'event': 'stack.api_call',
+            'method': method_name,
+            'status': 'success',
+            'items': len(response.get('items', ())),
+            'quota_remaining': response.get('quota_remaining')
+        })
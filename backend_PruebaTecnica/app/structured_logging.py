@@ -0,0 +1,122 @@
+# app/structured_logging.py
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Atributos propios de LogRecord; el resto viene de `extra` y se emite como campo
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro con los campos pasados en `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar solo una fracción de los eventos de alto volumen.
+    Los registros con `extra={'event': ...}` cuyo evento tenga tasa configurada
+    se conservan con esa probabilidad y llevan `sample_rate` para poder reescalar.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(getattr(record, 'event', None))
+        if rate is None:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Encola el registro sin formatearlo y sin esperar: el formateo y la escritura
+    ocurren en el hilo del QueueListener. Si la cola está llena el registro se descarta.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Mismo proceso: no hace falta convertir el registro en algo serializable
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Cola de logs del logger `app` con un único hilo que escribe en stderr"""
+
+    def __init__(self):
+        self.handler: Optional[NonBlockingQueueHandler] = None
+        self._listener: Optional[QueueListener] = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+    def init_app(self, app) -> None:
+        with self._lock:
+            self.stop()
+            log_queue = queue.Queue(maxsize=app.config['LOG_QUEUE_SIZE'])
+            output = logging.StreamHandler(sys.stderr)
+            output.setFormatter(JsonFormatter())
+            self.handler = NonBlockingQueueHandler(log_queue)
+            self.handler.addFilter(SamplingFilter(app.config['LOG_SAMPLE_RATES']))
+
+            # Flask usa logging.getLogger('app') como app.logger; los servicios cuelgan de él
+            logger = logging.getLogger('app')
+            for handler in list(logger.handlers):
+                if isinstance(handler, NonBlockingQueueHandler):
+                    logger.removeHandler(handler)
+            logger.addHandler(self.handler)
+            logger.setLevel(app.config['LOG_LEVEL'])
+            logger.propagate = False
+
+            self._listener = QueueListener(log_queue, output, respect_handler_level=True)
+            self._listener.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def stop(self) -> None:
+        """Vacía la cola y detiene el hilo de escritura"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped if self.handler is not None else 0
+
+
+log_pipeline = LogPipeline()
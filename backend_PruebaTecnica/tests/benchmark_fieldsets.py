@@ -0,0 +1,63 @@
+# benchmark_fieldsets.py
+"""
+Compara serializar entidades ORM completas contra un SELECT de solo las
+columnas pedidas (?fields=), sobre una base SQLite en memoria.
+
+Uso: python tests/benchmark_fieldsets.py [numero_de_vuelos]
+"""
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app, db  # noqa: E402
+from app.api.fieldsets import parse_fields, select_fields  # noqa: E402
+from app.models import Airline, Airport, Flight, Movement  # noqa: E402
+
+
+def populate(total_flights):
+    db.session.add_all([Airline(nombre_aerolinea=f'Aerolinea {i}') for i in range(10)])
+    db.session.add_all([Airport(nombre_aeropuerto=f'Aeropuerto {i}') for i in range(10)])
+    db.session.add_all([Movement(descripcion='Salida'), Movement(descripcion='Llegada')])
+    db.session.flush()
+    start = date(2021, 1, 1)
+    db.session.execute(Flight.__table__.insert(), [{
+        'id_aerolinea': i % 10 + 1,
+        'id_aeropuerto': (i * 7) % 10 + 1,
+        'id_movimiento': i % 2 + 1,
+        'dia': start + timedelta(days=i % 365)
+    } for i in range(total_flights)])
+    db.session.commit()
+
+
+def measure(name, func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        body = json.dumps(func())
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:<32} {best * 1000:9.1f} ms {len(body) / 1024:10.1f} KiB")
+    return best
+
+
+def main():
+    total_flights = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        populate(total_flights)
+        print(f"\nVuelos: {total_flights}\n")
+        full = measure('ORM + to_dict() (completo)', lambda: [f.to_dict() for f in Flight.query.all()])
+        measure('?fields= (todas las columnas)', lambda: select_fields(parse_fields(Flight, None)))
+        only_ids = measure('?fields=id', lambda: select_fields(parse_fields(Flight, 'id')))
+        measure('?fields=id,dia', lambda: select_fields(parse_fields(Flight, 'id,dia')))
+        print(f"\nAceleración de ?fields=id frente a ORM completo: {full / only_ids:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
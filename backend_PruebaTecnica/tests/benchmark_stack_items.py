@@ -0,0 +1,111 @@
+# benchmark_stack_items.py
+"""
+Compara la memoria y el tiempo de parseo de respuestas de /search de Stack Exchange:
+response.json() guardando los dicts completos contra el parseo incremental
+a StackItem (solo los campos que usan los análisis).
+
+Simula un crawl de varias páginas de 100 items con la forma real de la API.
+
+Uso: python tests/benchmark_stack_items.py [paginas]
+"""
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.stack_analytics import StackAnalytics  # noqa: E402
+from app.services.stack_items import parse_search_response  # noqa: E402
+
+CHUNK_SIZE = 64 * 1024
+TAGS = ['perl', 'python', 'regex', 'arrays', 'json', 'linux', 'bash', 'sql', 'csv', 'unicode']
+
+
+def build_page(page: int, rng: random.Random) -> bytes:
+    """Página de 100 items con todos los campos que devuelve /search"""
+    items = []
+    for i in range(100):
+        n = page * 100 + i
+        items.append({
+            'tags': rng.sample(TAGS, 3),
+            'owner': {
+                'account_id': rng.randint(1, 10**7),
+                'reputation': rng.randint(1, 200000),
+                'user_id': rng.randint(1, 10**7),
+                'user_type': 'registered',
+                'accept_rate': rng.randint(0, 100),
+                'profile_image': f'https://www.gravatar.com/avatar/{n:032x}?s=256&d=identicon&r=PG',
+                'display_name': f'usuario {n}',
+                'link': f'https://stackoverflow.com/users/{n}/usuario-{n}'
+            },
+            'is_answered': rng.random() < 0.6,
+            'view_count': rng.randint(10, 100000),
+            'accepted_answer_id': rng.randint(1, 10**8),
+            'answer_count': rng.randint(0, 10),
+            'score': rng.randint(-5, 500),
+            'last_activity_date': 1600000000 + n * 60,
+            'creation_date': 1500000000 + n * 60,
+            'last_edit_date': 1550000000 + n * 60,
+            'question_id': 10**7 + n,
+            'content_license': 'CC BY-SA 4.0',
+            'link': f'https://stackoverflow.com/questions/{10**7 + n}/pregunta-numero-{n}-sobre-perl',
+            'title': f'Pregunta número {n} sobre expresiones regulares en Perl'
+        })
+    return json.dumps({'items': items, 'has_more': True, 'quota_max': 10000,
+                       'quota_remaining': 9000}).encode('utf-8')
+
+
+def crawl_full(pages):
+    items = []
+    for body in pages:
+        items.extend(json.loads(body)['items'])
+    return items
+
+
+def crawl_streaming(pages):
+    items = []
+    for body in pages:
+        chunks = (body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE))
+        items.extend(parse_search_response(chunks)['items'])
+    return items
+
+
+def measure(name, crawl, pages):
+    # Tiempo sin tracemalloc (que lo distorsiona); memoria en una segunda pasada
+    started = time.perf_counter()
+    items = crawl(pages)
+    elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    StackAnalytics(items).report()
+    analytics = time.perf_counter() - started
+
+    del items
+    gc.collect()
+    tracemalloc.start()
+    items = crawl(pages)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<28} {elapsed * 1000:9.1f} ms {retained / 2**20:10.1f} MiB {peak / 2**20:10.1f} MiB "
+          f"{analytics * 1000:12.1f} ms")
+    return retained
+
+
+def main():
+    total_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rng = random.Random(42)
+    pages = [build_page(page, rng) for page in range(total_pages)]
+    size = sum(len(body) for body in pages)
+    print(f"\nPáginas: {total_pages} ({total_pages * 100} items, {size / 2**20:.1f} MiB de JSON)\n")
+    print(f"{'':<28} {'parseo':>12} {'retenido':>14} {'pico':>14} {'análisis':>15}")
+    full = measure('response.json() (dicts)', crawl_full, pages)
+    compact = measure('streaming -> StackItem', crawl_streaming, pages)
+    print(f"\nMemoria retenida por los items: {full / compact:.1f}x menor con StackItem")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# check_file_analytics.py
+"""
+Verifica que `flask analyze-file` calcule lo mismo que las rutas /analytics/*:
+genera vuelos aleatorios en SQLite en memoria, los exporta a CSV, los analiza
+desde el archivo con varios procesos y compara contra flight_analytics.
+
+Uso: python tests/check_file_analytics.py [numero_de_vuelos] [procesos]
+"""
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+def populate(total_flights):
+    from app import db
+    from app.data.seed import seed_data
+    from app.models import Flight
+
+    seed_data()
+    rng = random.Random(7)
+    start = date(2021, 1, 1)
+    db.session.execute(Flight.__table__.insert(), [{
+        'id_aerolinea': rng.randint(1, 4),
+        'id_aeropuerto': rng.randint(1, 4),
+        'id_movimiento': rng.randint(1, 2),
+        'dia': start + timedelta(days=rng.randint(0, 364))
+    } for _ in range(total_flights)])
+    db.session.commit()
+
+
+def export_csv(path):
+    from app import db
+    from app.models import Flight
+
+    columns = [Flight.id, Flight.id_aerolinea, Flight.id_aeropuerto, Flight.id_movimiento, Flight.dia]
+    with open(path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow([column.key for column in columns])
+        writer.writerows(db.session.execute(db.select(*columns)))
+
+
+def main():
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from app import create_app, db
+    from app.models import Airline, Airport
+    from app.services import flight_analytics
+    from app.services.file_analytics import analyze_file, compare_with_sql
+
+    total_flights = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    app = create_app()
+    with app.app_context(), tempfile.TemporaryDirectory() as directory:
+        db.create_all()
+        populate(total_flights)
+        path = os.path.join(directory, 'flights.csv')
+        export_csv(path)
+
+        started = time.perf_counter()
+        sql_results = flight_analytics.get_analytics_snapshot()
+        sql_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        aggregates = analyze_file(path, workers)
+        file_elapsed = time.perf_counter() - started
+
+        airline_names = dict(db.session.query(Airline.id_aerolinea, Airline.nombre_aerolinea).all())
+        airport_names = dict(db.session.query(Airport.id_aeropuerto, Airport.nombre_aeropuerto).all())
+        file_results = aggregates.results(airline_names, airport_names)
+        differences = compare_with_sql(aggregates, file_results, sql_results, airline_names, airport_names)
+
+        print(f"\nVuelos: {total_flights} ({os.path.getsize(path) / 2**20:.1f} MiB de CSV), procesos: {workers}")
+        print(f"SQL:     {sql_elapsed * 1000:9.1f} ms")
+        print(f"Archivo: {file_elapsed * 1000:9.1f} ms ({aggregates.rows} filas)")
+        if differences:
+            for difference in differences:
+                print(f"  - {difference}")
+            sys.exit(f"{len(differences)} diferencias")
+        print("Paridad: OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# conftest.py
+"""
+Fixtures compartidas de las pruebas: una app por prueba con SQLite en memoria
+y todo el estado en disco (snapshot, resúmenes, jobs) dentro de tmp_path, sin
+tocar os.environ ni la carpeta instance/ del proyecto.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app, db  # noqa: E402
+from app.data.seed import seed_data  # noqa: E402
+from app.services.flight_sketches import flight_sketches  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(overrides={
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'STACK_SNAPSHOT_PATH': '',
+        'SKETCH_STATE_PATH': str(tmp_path / 'flight_sketches.json'),
+        'JOB_RESULTS_DIR': str(tmp_path / 'jobs')
+    })
+    with app.app_context():
+        db.create_all()
+        seed_data()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    # Los resúmenes son globales del proceso: la siguiente prueba empieza sin estado
+    flight_sketches.ready = False
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def add_flights(app):
+    """Inserta vuelos con un INSERT de Core: add_flights([(aerolínea, aeropuerto, movimiento, día), ...])"""
+    from app.models import Flight
+
+    def add(rows):
+        if rows:
+            db.session.execute(Flight.__table__.insert(), [{
+                'id_aerolinea': airline, 'id_aeropuerto': airport, 'id_movimiento': movement, 'dia': dia
+            } for airline, airport, movement, dia in rows])
+            db.session.commit()
+    return add
@@ -0,0 +1,313 @@
+# load_harness.py
+"""
+Harness de carga concurrente sobre las rutas /api/v1.
+
+Modos:
+  closed: `concurrency` clientes envían peticiones una tras otra durante `duration`.
+  open:   llegan `rate` peticiones por segundo (proceso de Poisson) sin esperar a
+          las anteriores; la latencia se mide desde el momento programado, por lo
+          que incluye la espera en cola (evita la omisión coordinada).
+
+Por defecto levanta la aplicación en proceso (SQLite en memoria con datos de prueba)
+y un Stack Exchange simulado local. Con --base-url se prueba un servidor ya levantado.
+
+Uso:
+  python tests/load_harness.py --mode closed --concurrency 8 --duration 10
+  python tests/load_harness.py --mode open --rate 200 --duration 10 --output report.json
+  python tests/load_harness.py --base-url http://127.0.0.1:5000 --mix /api/v1/airlines=5
+"""
+import argparse
+import bisect
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from test_integration import IntegrationTester  # noqa: E402
+
+# Mezcla por defecto: ruta -> peso relativo
+DEFAULT_MIX = {
+    '/api/v1/airlines': 10,
+    '/api/v1/airports': 10,
+    '/api/v1/movements': 5,
+    '/api/v1/flights?fields=id&limit=500': 5,
+    '/api/v1/analytics/busiest-airport': 8,
+    '/api/v1/analytics/most-active-airline': 8,
+    '/api/v1/analytics/busiest-day': 8,
+    '/api/v1/analytics/airlines-multiple-daily': 5,
+    '/api/v1/analytics/airline-active-days': 3,
+    '/api/v1/analytics/busiest-airport?approx=true': 3,
+    '/api/v1/analytics/matrix?dims=airline,airport,day&format=sparse': 2,
+    '/api/v1/analytics/timeseries?group=airline&interval=week': 2,
+    '/api/v1/stack/statistics': 5,
+    '/api/v1/stack/highest-reputation': 3,
+    '/api/v1/stack/least-viewed': 3,
+    '/api/v1/stack/timeline': 3,
+    '/api/v1/stack/analytics': 2,
+    '/api/v1/stack/compare?query=perl&query=python': 1
+}
+
+# Límites superiores (ms) de las cubetas del histograma de latencias
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf')]
+
+
+def stub_stack_items(total: int = 100) -> List[Dict]:
+    """Items sintéticos con la misma forma que la respuesta de /search"""
+    rng = random.Random(42)
+    return [{
+        'title': f'Pregunta {i}',
+        'link': f'https://stackoverflow.com/q/{i}',
+        'is_answered': rng.random() < 0.6,
+        'score': rng.randint(-2, 50),
+        'view_count': rng.randint(10, 5000),
+        'answer_count': rng.randint(0, 5),
+        'creation_date': 1600000000 + i * 3600,
+        'tags': rng.sample(['perl', 'python', 'regex', 'arrays', 'json'], 2),
+        'owner': {'reputation': rng.randint(1, 100000), 'display_name': f'user{i}'}
+    } for i in range(total)]
+
+
+def start_stack_stub(latency: float = 0.0) -> ThreadingHTTPServer:
+    """Servidor local que imita GET /2.2/search de Stack Exchange"""
+    body = json.dumps({'items': stub_stack_items(), 'has_more': False}).encode('utf-8')
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_in_process_app(stub_url: str, flights: int = 5000) -> str:
+    """Levanta la app con SQLite en memoria y datos de prueba; devuelve su URL base"""
+    from datetime import date, timedelta
+    from werkzeug.serving import make_server
+    from app import create_app, db
+    from app.api.routers import stack_service
+    from app.data.seed import seed_data
+    from app.models import Flight
+
+    # Nada en instance/: los datos del stub no deben quedar como snapshot de la app real
+    state_dir = tempfile.mkdtemp(prefix='load-harness-')
+    app = create_app(overrides={
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'STACK_SNAPSHOT_PATH': '',
+        'SKETCH_STATE_PATH': os.path.join(state_dir, 'flight_sketches.json'),
+        'JOB_RESULTS_DIR': os.path.join(state_dir, 'jobs')
+    })
+    with app.app_context():
+        db.create_all()
+        seed_data()
+        start = date(2021, 1, 1)
+        db.session.execute(Flight.__table__.insert(), [{
+            'id_aerolinea': i % 4 + 1,
+            'id_aeropuerto': (i * 3) % 4 + 1,
+            'id_movimiento': i % 2 + 1,
+            'dia': start + timedelta(days=i % 365)
+        } for i in range(flights)])
+        db.session.commit()
+
+    stack_service.base_url = stub_url
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+class LoadHarness(IntegrationTester):
+    """Extiende IntegrationTester con ejecución concurrente y métricas de latencia"""
+
+    def __init__(self, base_url: str, mix: Optional[Dict[str, int]] = None, timeout: float = 30):
+        super().__init__(base_url)
+        self.mix = mix or DEFAULT_MIX
+        self.timeout = timeout
+        self._paths = list(self.mix)
+        self._weights = [self.mix[path] for path in self._paths]
+        self._samples: List[tuple] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _pick(self, rng: random.Random) -> str:
+        return rng.choices(self._paths, weights=self._weights)[0]
+
+    def _request(self, path: str, scheduled: Optional[float] = None) -> None:
+        """Envía una petición y registra (ruta, latencia, estado)"""
+        started = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            response = self._session().get(f"{self.base_url}{path}", timeout=self.timeout)
+            status = response.status_code
+        except requests.RequestException:
+            status = 0
+        latency = time.perf_counter() - started
+        with self._lock:
+            self._samples.append((path, latency, status))
+
+    def run_closed(self, concurrency: int, duration: float) -> float:
+        deadline = time.perf_counter() + duration
+
+        def worker(seed: int):
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                self._request(self._pick(rng))
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    def run_open(self, rate: float, duration: float, concurrency: int) -> float:
+        rng = random.Random(0)
+        started = time.perf_counter()
+        deadline = started + duration
+        next_arrival = started
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while next_arrival < deadline:
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._request, self._pick(rng), next_arrival)
+                next_arrival += rng.expovariate(rate)
+        return time.perf_counter() - started
+
+    @staticmethod
+    def _summary(latencies: List[float], statuses: List[int], elapsed: float) -> Dict:
+        ordered = sorted(latencies)
+        total = len(ordered)
+
+        def percentile(p: float) -> Optional[float]:
+            # Método nearest-rank
+            if not ordered:
+                return None
+            return round(ordered[max(0, math.ceil(p / 100 * total) - 1)] * 1000, 3)
+
+        counts = [0] * len(HISTOGRAM_BUCKETS_MS)
+        for value in ordered:
+            counts[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, value * 1000)] += 1
+        labels = [f'<={upper}ms' for upper in HISTOGRAM_BUCKETS_MS[:-1]]
+        labels.append(f'>{HISTOGRAM_BUCKETS_MS[-2]}ms')
+        histogram = dict(zip(labels, counts))
+
+        errors = sum(1 for status in statuses if status == 0 or status >= 500)
+        return {
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0,
+            'latency_ms': {
+                'p50': percentile(50),
+                'p95': percentile(95),
+                'p99': percentile(99),
+                'max': round(ordered[-1] * 1000, 3) if ordered else None
+            },
+            'histogram': histogram,
+            'error_rate': round(errors / total, 4) if total else 0,
+            'shed_503': sum(1 for status in statuses if status == 503),
+            'status_codes': {str(code): statuses.count(code) for code in sorted(set(statuses))}
+        }
+
+    def report(self, mode: str, elapsed: float, settings: Dict) -> Dict:
+        by_route: Dict[str, tuple] = {}
+        for path, latency, status in self._samples:
+            latencies, statuses = by_route.setdefault(path, ([], []))
+            latencies.append(latency)
+            statuses.append(status)
+        return {
+            'mode': mode,
+            'base_url': self.base_url,
+            'settings': settings,
+            'elapsed_s': round(elapsed, 3),
+            'overall': self._summary(
+                [sample[1] for sample in self._samples],
+                [sample[2] for sample in self._samples],
+                elapsed
+            ),
+            'routes': {
+                path: self._summary(latencies, statuses, elapsed)
+                for path, (latencies, statuses) in sorted(by_route.items())
+            }
+        }
+
+
+def parse_mix(entries: List[str]) -> Optional[Dict[str, int]]:
+    if not entries:
+        return None
+    mix = {}
+    for entry in entries:
+        path, _, weight = entry.rpartition('=')
+        mix[path] = int(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pruebas de carga sobre /api/v1')
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--rate', type=float, default=100, help='peticiones/s en modo open')
+    parser.add_argument('--mix', action='append', default=[], help='ruta=peso (repetible)')
+    parser.add_argument('--base-url', help='servidor ya levantado; si no, se usa la app en proceso')
+    parser.add_argument('--flights', type=int, default=5000, help='vuelos de prueba en modo en proceso')
+    parser.add_argument('--stub-latency', type=float, default=0.0, help='latencia simulada de Stack Exchange (s)')
+    parser.add_argument('--output', help='archivo JSON para el reporte (por defecto stdout)')
+    args = parser.parse_args()
+
+    base_url = args.base_url
+    if base_url is None:
+        stub = start_stack_stub(args.stub_latency)
+        base_url = start_in_process_app(f'http://127.0.0.1:{stub.server_port}/2.2', args.flights)
+
+    harness = LoadHarness(base_url, parse_mix(args.mix))
+    harness.print_header(f"CARGA {args.mode.upper()} - {base_url}")
+    if args.mode == 'closed':
+        elapsed = harness.run_closed(args.concurrency, args.duration)
+    else:
+        elapsed = harness.run_open(args.rate, args.duration, args.concurrency)
+
+    settings = {'concurrency': args.concurrency, 'duration': args.duration, 'mix': harness.mix}
+    if args.mode == 'open':
+        settings['rate'] = args.rate
+    report = harness.report(args.mode, elapsed, settings)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output)
+        overall = report['overall']
+        print(f"{overall['requests']} peticiones, {overall['throughput_rps']} req/s, "
+              f"p99 {overall['latency_ms']['p99']} ms -> {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# test_batch.py
+"""
+Pruebas de /api/v1/batch: despacho completo de cada sub-petición, contexto
+propio por sub-petición y cupo de admisión tomado por el batch.
+
+Uso: python -m pytest tests/test_batch.py
+"""
+import pytest
+
+from app import db
+from app.admission import admission
+from app.api import routers
+
+URL = '/api/v1/batch'
+STACK_PATHS = [f'/api/v1/stack/statistics?query=q{i}' for i in range(4)]
+
+
+@pytest.fixture
+def stack_data(monkeypatch):
+    """Datos fijos de Stack Exchange para las rutas /stack/ (sin red)"""
+    monkeypatch.setattr(routers.stack_service, '_get_data',
+                        lambda params=None: {'items': [], 'has_more': False, 'quota_remaining': 100})
+
+
+def test_sub_requests_run_hooks_in_their_own_context(app, client, stack_data):
+    sessions = []
+
+    @app.after_request
+    def mark(response):
+        sessions.append(db.session())
+        return response
+
+    paths = ['/api/v1/flights?fields=id&limit=2', '/api/v1/analytics/busiest-airport'] + STACK_PATHS[:2]
+    response = client.post(URL, json={'requests': paths + ['/api/v1/nope']})
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert [result['status'] for result in data] == [200, 200, 200, 200, 404]
+    assert len(data[0]['body']) == 2
+    # Un after_request por sub-petición despachada más el del batch,
+    # cada uno con su propia sesión de SQLAlchemy
+    assert len(sessions) == len(paths) + 1
+    assert len({id(session) for session in sessions}) == len(sessions)
+
+
+def test_batch_does_not_shed_its_own_sub_requests(client, stack_data, monkeypatch):
+    limiter = admission.get_limiter('stack')
+    monkeypatch.setattr(limiter, 'max_concurrent', 1)
+    monkeypatch.setattr(limiter, 'max_queue', 0)
+    response = client.post(URL, json={'requests': STACK_PATHS})
+    assert response.status_code == 200
+    assert [result['status'] for result in response.get_json()['data']] == [200] * len(STACK_PATHS)
+    assert limiter.stats() == {'active': 0, 'waiting': 0}
+
+    # Sin cupo el batch completo se rechaza una sola vez
+    assert limiter.acquire()
+    try:
+        response = client.post(URL, json={'requests': STACK_PATHS})
+    finally:
+        limiter.release()
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(limiter.retry_after)
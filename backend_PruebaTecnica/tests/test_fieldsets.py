@@ -0,0 +1,41 @@
+# test_fieldsets.py
+"""
+Pruebas de ?fields= y de la paginación por id de /api/v1/flights.
+
+Uso: python -m pytest tests/test_fieldsets.py
+"""
+from datetime import date, timedelta
+
+from app import db
+from app.models import Flight
+
+
+def test_flights_keyset_pages_cover_table(client, add_flights):
+    start = date(2021, 1, 1)
+    add_flights([(1 + i % 4, 1 + i % 3, 1 + i % 2, start + timedelta(days=i % 30)) for i in range(250)])
+    total = db.session.query(Flight).count()
+    seen, after, pages = [], None, 0
+    while True:
+        url = '/api/v1/flights?fields=dia&limit=40' + (f'&after_id={after}' if after else '')
+        response = client.get(url)
+        assert response.status_code == 200
+        rows = response.get_json()
+        assert len(rows) <= 40 and all(list(row) == ['dia'] for row in rows)
+        seen.extend(rows)
+        pages += 1
+        after = response.headers.get('X-Next-After-Id')
+        if after is None:
+            break
+    assert len(seen) == total and pages == -(-total // 40)
+
+    ids = [row['id'] for row in client.get('/api/v1/flights?fields=id&limit=10&after_id=5').get_json()]
+    assert ids == sorted(ids) and ids[0] > 5 and len(ids) == 10
+
+
+def test_flights_page_size_is_capped(client):
+    max_size = client.application.config['FLIGHTS_MAX_PAGE_SIZE']
+    for query in (f'limit={max_size + 1}', 'limit=0', 'limit=abc', 'limit=²', 'after_id=-1', 'after_id=²'):
+        response = client.get(f'/api/v1/flights?{query}')
+        assert response.status_code == 400, query
+        assert response.get_json()['status'] == 'error'
+    assert client.get('/api/v1/flights?fields=nope').status_code == 400
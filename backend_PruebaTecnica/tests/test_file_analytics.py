@@ -0,0 +1,90 @@
+# test_file_analytics.py
+"""
+Pruebas de la lectura de CSV de `flask analyze-file`: el mismo archivo con y
+sin comillas da los mismos agregados, varios procesos dan lo mismo que uno,
+las comillas sin cerrar se rechazan y los fallos del pool llegan como error
+del comando.
+
+Uso: python -m pytest tests/test_file_analytics.py
+"""
+import csv
+import os
+import random
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+
+import pytest
+
+from app.services import file_analytics
+from app.services.file_analytics import CHUNKS_PER_WORKER, FileAnalyticsError, analyze_file, chunk_ranges
+
+HEADER = ['id', 'id_aerolinea', 'id_aeropuerto', 'id_movimiento', 'dia']
+
+
+def random_rows(total, seed=11):
+    rng = random.Random(seed)
+    start = date(2021, 1, 1)
+    return [[i + 1, rng.randint(1, 4), rng.randint(1, 4), rng.randint(1, 2),
+             (start + timedelta(days=rng.randint(0, 59))).strftime('%Y-%m-%d')] for i in range(total)]
+
+
+def write_csv(directory, name, rows, quoting=csv.QUOTE_MINIMAL, header=HEADER, lineterminator='\r\n'):
+    path = os.path.join(directory, name)
+    with open(path, 'w', newline='') as handle:
+        writer = csv.writer(handle, quoting=quoting, lineterminator=lineterminator)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return path
+
+
+def test_quoted_csv_matches_plain(tmp_path):
+    rows = random_rows(3000)
+    plain = analyze_file(write_csv(tmp_path, 'plain.csv', rows), workers=1)
+    quoted = analyze_file(write_csv(tmp_path, 'quoted.csv', rows, csv.QUOTE_ALL), workers=1)
+    assert plain.rows == quoted.rows == len(rows) and quoted.skipped == 0
+    assert plain.airline_days == quoted.airline_days and plain.airports == quoted.airports
+    assert all(not dia.startswith('"') for _, dia in quoted.airline_days)
+
+
+def test_quoted_field_with_comma(tmp_path):
+    # La coma dentro de comillas no desplaza las columnas siguientes
+    header = ['id', 'comentario', 'id_aerolinea', 'id_aeropuerto', 'dia']
+    rows = [[1, 'demora, lluvia', 2, 3, '2021-05-01'], [2, 'ok', 2, 1, '2021-05-01']]
+    aggregates = analyze_file(write_csv(tmp_path, 'comma.csv', rows, header=header), workers=1)
+    assert aggregates.rows == 2 and aggregates.skipped == 0
+    assert aggregates.airline_days == {(2, '2021-05-01'): 2}
+
+
+@pytest.mark.parametrize('lineterminator', ['\r\n', '\n'])
+def test_workers_match_single_process(tmp_path, lineterminator):
+    rows = random_rows(5000, seed=5)
+    path = write_csv(tmp_path, 'flights.csv', rows, lineterminator=lineterminator)
+    workers = 3
+    with open(path, 'rb') as handle:
+        data_start = len(handle.readline())
+    assert len(chunk_ranges(path, data_start, workers * CHUNKS_PER_WORKER)) > workers
+
+    single = analyze_file(path, workers=1)
+    parallel = analyze_file(path, workers=workers)
+    assert parallel.rows == single.rows == len(rows) and parallel.skipped == single.skipped == 0
+    assert parallel.airline_days == single.airline_days and parallel.airports == single.airports
+    assert all(len(dia) == 10 for _, dia in parallel.airline_days)
+
+
+def test_unterminated_quote_is_rejected(tmp_path):
+    path = tmp_path / 'broken.csv'
+    path.write_text('id,id_aerolinea,id_aeropuerto,dia\n1,2,3,"2021-05-01\n2021-05-02",x\n')
+    with pytest.raises(FileAnalyticsError):
+        analyze_file(str(path), workers=1)
+
+
+@pytest.mark.parametrize('error', [BrokenProcessPool('murió un proceso'), PermissionError('sin permiso')])
+def test_command_reports_pool_and_io_errors(app, tmp_path, monkeypatch, error):
+    def fail(path, workers=None):
+        raise error
+
+    monkeypatch.setattr(file_analytics, 'analyze_file', fail)
+    path = write_csv(tmp_path, 'flights.csv', random_rows(10))
+    result = app.test_cli_runner().invoke(args=['analyze-file', path, '--workers', '2'])
+    assert result.exit_code == 1 and 'Error:' in result.output
+    assert not isinstance(result.exception, type(error))
@@ -0,0 +1,147 @@
+# test_jobs.py
+"""
+Pruebas de los jobs: recorrido parcial de stack_crawl cuando falla una página,
+recuperación del pool de procesos cuando muere un proceso hijo y resultados
+que no se pueden guardar en disco.
+
+Uso: python -m pytest tests/test_jobs.py
+"""
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from app.services import jobs
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.rate_limiter import TokenBucket
+from app.services.stackoverflow_service import APIError
+
+
+def item(index):
+    return {'question_id': index, 'title': f'q{index}', 'link': f'l{index}', 'is_answered': index % 2 == 0,
+            'view_count': index, 'creation_date': 1600000000 + index, 'owner': {'reputation': index}}
+
+
+@pytest.fixture
+def crawl(monkeypatch):
+    """crawl(pages) ejecuta stack_crawl en este proceso con una respuesta (o error) por página"""
+    def run(pages):
+        calls, sleeps = [], []
+
+        def fetch(self, params):
+            calls.append(params['page'])
+            outcome = pages[params['page']]
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        monkeypatch.setattr(jobs.StackOverflowService, '_fetch_data', fetch)
+        monkeypatch.setattr(jobs.time, 'sleep', sleeps.append)
+        params = jobs.validate_stack_crawl({'max_pages': 5})
+        try:
+            return jobs.run_stack_crawl(params, lambda fraction, message: None), calls, sleeps
+        except Exception as e:
+            return e, calls, sleeps
+    return run
+
+
+def test_crawl_keeps_pages_when_a_page_fails(crawl):
+    pages = {
+        1: {'items': [item(1), item(2)], 'has_more': True, 'backoff': 3},
+        2: APIError("Timeout al conectar con Stack Exchange")
+    }
+    result, calls, sleeps = crawl(pages)
+    assert result['complete'] is False and result['pages_fetched'] == 1
+    assert result['total_items'] == 2 and 'Página 2' in result['error']
+    assert calls == [1] + [2] * (jobs.CRAWL_PAGE_RETRIES + 1)
+    # Los reintentos esperan al menos el backoff pedido por la API
+    assert sleeps and all(seconds >= 3 for seconds in sleeps)
+
+
+def test_crawl_retries_transient_errors(crawl):
+    attempts = iter([APIError("Error de conexión"), {'items': [item(3)], 'has_more': False}])
+
+    class Pages(dict):
+        def __getitem__(self, page):
+            return next(attempts) if page == 2 else dict.__getitem__(self, page)
+
+    result, calls, _ = crawl(Pages({1: {'items': [item(1)], 'has_more': True}}))
+    assert result['complete'] is True and result['total_items'] == 2 and calls == [1, 2, 2]
+
+
+def test_crawl_fails_without_any_page(crawl):
+    result, calls, _ = crawl({1: APIError("Error de conexión")})
+    assert isinstance(result, APIError) and len(calls) == jobs.CRAWL_PAGE_RETRIES + 1
+
+
+def test_crawl_goes_through_breaker_and_rate_limit(crawl, monkeypatch):
+    waits = []
+    acquire = TokenBucket.acquire
+
+    def record(self, timeout):
+        waits.append((id(self), timeout))
+        return acquire(self, timeout)
+
+    monkeypatch.setattr(TokenBucket, 'acquire', record)
+    pages = {1: {'items': [item(1)], 'has_more': True}, 2: {'items': [item(2)], 'has_more': False}}
+    result, calls, _ = crawl(pages)
+    assert result['complete'] is True and calls == [1, 2]
+    # Todas las páginas comparten el límite de tasa de la consulta
+    assert len({limiter for limiter, _ in waits}) == 1
+    assert [timeout for _, timeout in waits] == [jobs.CRAWL_RATE_WAIT] * 2
+
+    monkeypatch.setattr(CircuitBreaker, 'allow_request', lambda self: False)
+    result, calls, _ = crawl(pages)
+    assert isinstance(result, APIError) and calls == []
+
+
+def wait_finished(manager, app, job, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = manager.get(app, job.id)
+        if data['state'] in ('done', 'failed'):
+            return data
+        time.sleep(0.1)
+    raise AssertionError(f'el job {job.id} no terminó')
+
+
+def test_broken_pool_is_replaced(app, monkeypatch):
+    # Los procesos hijos reciben la configuración de la app, no la del entorno
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    app.config['JOBS_MAX_WORKERS'] = 1
+    manager = jobs.JobManager()
+
+    job, _ = manager.submit(app, 'flight_report', {})
+    broken = manager._executor
+    # Matar el hijo simula un proceso que muere (p. ej. por falta de memoria)
+    while not broken._processes:
+        time.sleep(0.05)
+    for process in list(broken._processes.values()):
+        process.kill()
+    data = wait_finished(manager, app, job)
+    assert data['state'] == 'failed' and 'inesperadamente' in data['error']
+
+    # El siguiente job no devuelve BrokenProcessPool: corre en un pool nuevo
+    job, created = manager.submit(app, 'flight_report', {})
+    assert created and manager._executor is not broken
+    data = wait_finished(manager, app, job)
+    assert 'inesperadamente' not in (data.get('error') or '')
+    manager._executor.shutdown()
+
+
+def test_store_failure_marks_job_failed(tmp_path):
+    manager = jobs.JobManager()
+    manager._progress = {}
+    # Una ruta que es un archivo hace fallar os.makedirs con OSError
+    manager._results_dir = str(tmp_path / 'not-a-dir')
+    (tmp_path / 'not-a-dir').write_text('')
+    job = jobs.Job('flight_report', {}, 'key')
+    manager._jobs[job.id] = job
+    manager._active[job.key] = job.id
+
+    future = Future()
+    future.set_result({'total_flights': 9})
+    manager._finish(job, future, None)
+    data = manager.get(None, job.id)
+    assert data['state'] == 'failed' and 'guardar' in data['error'] and 'result' not in data
+    assert job.key not in manager._active and list(tmp_path.iterdir()) == [tmp_path / 'not-a-dir']
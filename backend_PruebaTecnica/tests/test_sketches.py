@@ -0,0 +1,167 @@
+# test_sketches.py
+"""
+Pruebas de precisión de SpaceSaving y HyperLogLog y del mantenimiento de
+FlightSketches al insertar vuelos.
+
+Uso: python -m pytest tests/test_sketches.py
+"""
+import random
+import threading
+from collections import Counter
+from datetime import date, timedelta
+
+from app import db
+from app.models import Flight
+from app.services.flight_sketches import FlightSketches, flight_sketches
+from app.services.sketches import HyperLogLog, SpaceSaving
+
+
+def zipf_stream(rng, keys, total, s=1.2):
+    weights = [1 / (rank ** s) for rank in range(1, keys + 1)]
+    return [f'k{index}' for index in rng.choices(range(keys), weights=weights, k=total)]
+
+
+def check_space_saving_bounds(sketch, exact):
+    """Invariantes de Space-Saving: real en [conteo - error, conteo] y error <= total / k"""
+    assert sketch.total == sum(exact.values())
+    for key, (count, error) in sketch.counters.items():
+        assert count - error <= exact[key] <= count, key
+        assert error <= sketch.total / sketch.k
+    # Todo elemento con frecuencia mayor a total / k tiene que estar en el resumen
+    for key, count in exact.items():
+        if count > sketch.total / sketch.k:
+            assert key in sketch.counters, key
+
+
+def test_space_saving_exact_below_k():
+    stream = [f'k{i % 10}' for i in range(1000)]
+    sketch = SpaceSaving(k=16)
+    for key in stream:
+        sketch.add(key)
+    exact = Counter(stream)
+    assert all(sketch.counters[key] == [count, 0] for key, count in exact.items())
+
+
+def test_space_saving_skewed():
+    rng = random.Random(1)
+    stream = zipf_stream(rng, keys=5000, total=100000)
+    sketch = SpaceSaving(k=64)
+    for key in stream:
+        sketch.add(key)
+    exact = Counter(stream)
+    check_space_saving_bounds(sketch, exact)
+
+    true_top = [key for key, _ in exact.most_common(5)]
+    sketch_top = [key for key, _, _ in sketch.top(5)]
+    assert sketch_top[0] == true_top[0]
+    assert set(true_top) <= {key for key, _, _ in sketch.top(10)}
+    key, count, error = sketch.top(1)[0]
+    assert count - error >= sketch.top(2)[1][1]  # máximo garantizado con distribución sesgada
+
+
+def test_space_saving_uniform():
+    rng = random.Random(2)
+    stream = [f'k{rng.randrange(1000)}' for _ in range(50000)]
+    sketch = SpaceSaving(k=64)
+    for key in stream:
+        sketch.add(key)
+    # Con distribución uniforme no hay garantía de top-k, pero las cotas se cumplen
+    check_space_saving_bounds(sketch, Counter(stream))
+
+
+def test_space_saving_roundtrip():
+    sketch = SpaceSaving(k=8)
+    for key in zipf_stream(random.Random(3), keys=100, total=1000):
+        sketch.add(key)
+    restored = SpaceSaving.from_dict(sketch.to_dict())
+    assert restored.counters == sketch.counters and restored.total == sketch.total
+
+
+def assert_hll_close(hll, true_count, sigmas=3):
+    estimate = hll.count()
+    assert abs(estimate - true_count) <= sigmas * hll.relative_error * true_count + 1, (estimate, true_count)
+
+
+def test_hll_uniform_cardinalities():
+    for true_count in (10, 365, 5000, 100000):
+        hll = HyperLogLog(p=12)
+        for i in range(true_count):
+            hll.add(f'v{i}')
+        assert_hll_close(hll, true_count)
+
+
+def test_hll_skewed_duplicates():
+    # Muchas repeticiones de pocos valores no inflan la estimación
+    rng = random.Random(4)
+    stream = zipf_stream(rng, keys=2000, total=200000)
+    hll = HyperLogLog(p=12)
+    for value in stream:
+        hll.add(value)
+    assert_hll_close(hll, len(set(stream)))
+
+
+def test_hll_days():
+    hll = HyperLogLog(p=12)
+    start = date(2021, 1, 1)
+    for repeat in range(3):
+        for offset in range(365):
+            hll.add((start + timedelta(days=offset)).strftime('%Y-%m-%d'))
+    assert_hll_close(hll, 365)
+    restored = HyperLogLog.from_dict(hll.to_dict())
+    assert restored.count() == hll.count()
+
+
+def test_flight_sketches_maintained_on_insert(client):
+    # Sin estado construido, ?approx=true responde con el valor exacto
+    assert 'approximate' not in client.get('/api/v1/analytics/busiest-day?approx=true').get_json()
+
+    flight_sketches.rebuild()
+    before = client.get('/api/v1/analytics/busiest-day?approx=true').get_json()
+    assert before['approximate'] and before['date'] == '2021-05-02' and before['total_flights'] == 6
+
+    # Ids fuera de orden: el hook aplica lo que se confirma, no depende de una marca de agua
+    db.session.add_all([Flight(id=1000 - i, id_aerolinea=1, id_aeropuerto=2, id_movimiento=1,
+                               dia=date(2021, 5, 4)) for i in range(5)])
+    db.session.commit()
+    after = client.get('/api/v1/analytics/busiest-day?approx=true').get_json()
+    assert after['date'] == '2021-05-04' and after['total_flights'] == 8
+
+    db.session.add(Flight(id_aerolinea=1, id_aeropuerto=2, id_movimiento=1, dia=date(2021, 5, 4)))
+    db.session.flush()
+    db.session.rollback()
+    assert flight_sketches.days['2021-05-04'] == 8
+
+
+def test_commit_hook_does_not_write_state(client, monkeypatch):
+    # El estado se guarda desde el hilo de fondo (o flush), nunca dentro del commit
+    flight_sketches.rebuild()
+    writers = []
+    original = FlightSketches._write
+    monkeypatch.setattr(FlightSketches, '_write', staticmethod(
+        lambda path, state: (writers.append(threading.current_thread().name), original(path, state))))
+
+    db.session.add(Flight(id_aerolinea=1, id_aeropuerto=2, id_movimiento=1, dia=date(2021, 5, 2)))
+    db.session.commit()
+    assert 'MainThread' not in writers
+    # La consulta incorpora lo encolado aunque el hilo de fondo aún no haya corrido
+    assert client.get('/api/v1/analytics/busiest-day?approx=true').get_json()['total_flights'] == 7
+    flight_sketches.flush()
+    saved = FlightSketches()
+    assert saved.load(client.application.config['SKETCH_STATE_PATH']) and saved.days['2021-05-02'] == 7
+
+
+def test_second_writer_process_disables_approx(app, client):
+    flight_sketches.rebuild()
+    assert client.get('/api/v1/analytics/busiest-day?approx=true').status_code == 200
+
+    # Otra instancia abre su propio candado, igual que lo haría otro proceso
+    other = FlightSketches()
+    other.apply([(1, 2, date(2021, 5, 4))])
+    other.flush()
+    response = client.get('/api/v1/analytics/busiest-day?approx=true')
+    assert response.status_code == 409 and response.get_json()['status'] == 'error'
+    # Sin ?approx se sigue respondiendo con el valor exacto
+    assert client.get('/api/v1/analytics/busiest-day').status_code == 200
+
+    flight_sketches.rebuild()
+    assert client.get('/api/v1/analytics/busiest-day?approx=true').status_code == 200
@@ -0,0 +1,150 @@
+# test_stack_service.py
+"""
+Pruebas del circuit breaker y del estado por consulta de StackOverflowService,
+con requests.get simulado (sin llamadas reales a Stack Exchange).
+
+Uso: python -m pytest tests/test_stack_service.py
+"""
+import threading
+
+import pytest
+import requests
+
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.rate_limiter import TokenBucket
+from app.services.stackoverflow_service import StackOverflowService
+
+BODY = b'{"items": [], "has_more": false, "quota_remaining": 100}'
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=BODY):
+        self.status_code = status_code
+        self.body = body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error", response=self)
+
+    def iter_content(self, chunk_size=1):
+        yield self.body
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def service():
+    service = StackOverflowService()
+    service.rate_limit = (1000, 1000)
+    return service
+
+
+@pytest.fixture
+def respond(monkeypatch):
+    """respond(status, body) fija la respuesta de requests.get; devuelve la lista de llamadas"""
+    calls = []
+
+    def set_response(status_code=200, body=BODY):
+        def get(url, **kwargs):
+            calls.append(kwargs.get('params'))
+            return FakeResponse(status_code, body)
+        monkeypatch.setattr(requests, 'get', get)
+        return calls
+    return set_response
+
+
+def fetch(service, params):
+    """Datos de la consulta, o None si falló (el error ya lo maneja handle_api_errors)"""
+    try:
+        return service._get_data(params)
+    except Exception:
+        return None
+
+
+def open_circuit(service):
+    """Abre el circuito y deja vencido el tiempo de espera: la próxima llamada es de prueba"""
+    service.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    service.circuit_breaker.record_failure()
+    assert service.circuit_breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_client_errors_do_not_open_circuit(service, respond):
+    bogus = service.build_search_params(site='bogus')
+    respond(400)
+    for _ in range(5):
+        assert fetch(service, bogus) is None
+    assert service.circuit_breaker.state == CircuitBreaker.CLOSED
+    respond()
+    assert service._get_data(service.search_params)['items'] == []
+
+
+def test_server_errors_open_circuit(service, respond):
+    respond(503)
+    for _ in range(service.circuit_breaker.failure_threshold):
+        assert fetch(service, service.search_params) is None
+    assert service.circuit_breaker.state == CircuitBreaker.OPEN
+
+
+def test_per_query_state_is_bounded(service, respond):
+    service.MAX_CACHE_ENTRIES = 8
+    respond(400)
+    for index in range(50):
+        fetch(service, service.build_search_params(query=f'q{index}'))
+    assert len(service._fetch_locks) <= service.MAX_CACHE_ENTRIES
+    assert len(service._rate_limiters) <= service.MAX_CACHE_ENTRIES
+
+    respond()
+    for index in range(50):
+        service._get_data(service.build_search_params(query=f'ok{index}'))
+    assert len(service.cache) <= service.MAX_CACHE_ENTRIES
+    assert len(service._fetch_locks) <= service.MAX_CACHE_ENTRIES + 1
+    assert len(service._rate_limiters) <= service.MAX_CACHE_ENTRIES + 1
+
+
+def test_entries_in_use_are_not_discarded(service):
+    key = service._cache_key(service.search_params)
+    # Obtenidos por otro hilo que todavía no llegó a usarlos
+    lock = service._per_key(service._fetch_locks, key, threading.Lock)
+    limiter = service._per_key(service._rate_limiters, key, lambda: TokenBucket(1, 1))
+    service._forget(key)
+    assert service._fetch_locks[key] is lock and service._rate_limiters[key] is limiter
+    assert service._per_key(service._rate_limiters, key, lambda: TokenBucket(1, 1)) is limiter
+
+    service._release_key(service._fetch_locks, key)
+    service._release_key(service._rate_limiters, key)
+    service._forget(key)
+    assert service._rate_limiters[key] is limiter and key not in service._fetch_locks
+    service._release_key(service._rate_limiters, key)
+    service._forget(key)
+    assert key not in service._rate_limiters and not service._key_users
+
+
+def test_compare_queries_sees_active_snapshot(service, respond):
+    calls = respond()
+    params = service.build_search_params(query='python')
+    with service.snapshot(params, data={'items': [], 'has_more': False}):
+        results = service.compare_queries([params])
+    assert not calls and 'error' not in results[0]
+    assert results[0]['statistics']['total_questions'] == 0
+
+
+def test_unexpected_error_in_probe_reopens_circuit(service, respond):
+    open_circuit(service)
+    # owner que no es un objeto: StackItem.from_dict falla con un error no previsto
+    respond(body=b'{"items": [{"owner": 5, "title": "t", "link": "l"}]}')
+    assert fetch(service, service.search_params) is None
+    assert service.circuit_breaker._state == CircuitBreaker.OPEN
+    respond()
+    assert fetch(service, service.search_params) is not None
+    assert service.circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_rate_limited_call_does_not_take_probe(service, respond):
+    service.rate_limit = (0, 0)
+    open_circuit(service)
+    calls = respond()
+    assert fetch(service, service.search_params) is None
+    assert not calls
+    # La llamada rechazada por el límite no consumió la llamada de prueba
+    assert service.circuit_breaker._state == CircuitBreaker.OPEN
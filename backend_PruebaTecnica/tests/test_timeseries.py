@@ -0,0 +1,78 @@
+# test_timeseries.py
+"""
+Pruebas de /api/v1/analytics/timeseries: relleno de cubetas vacías, cubetas
+por semana y mes, reducción a max_points y validación de parámetros.
+
+Uso: python -m pytest tests/test_timeseries.py
+"""
+from datetime import date
+
+from app import db
+from app.models import Flight
+
+URL = '/api/v1/analytics/timeseries'
+
+
+def series_by_id(body):
+    return {series['id']: series for series in body['series']}
+
+
+def test_day_buckets_fill_gaps_with_zeros(client):
+    response = client.get(f'{URL}?from=2021-05-01&to=2021-05-05')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['buckets'] == ['2021-05-01', '2021-05-02', '2021-05-03', '2021-05-04', '2021-05-05']
+    series = series_by_id(body)
+    assert series[2]['counts'] == [0, 2, 0, 1, 0]
+    assert series[3]['counts'] == [0, 1, 0, 2, 0]
+    assert body['total'] == 9 and body['bucket_span'] == 1
+
+
+def test_week_and_month_buckets(client, add_flights):
+    add_flights([(1, 1, 1, date(2021, 5, 9)), (1, 1, 1, date(2021, 5, 10)), (1, 1, 1, date(2021, 7, 1))])
+
+    weeks = client.get(f'{URL}?interval=week&airline=1').get_json()
+    # 2021-05-02 es domingo: cae en la semana del lunes 26 de abril
+    assert weeks['buckets'][:3] == ['2021-04-26', '2021-05-03', '2021-05-10']
+    assert weeks['buckets'][-1] == '2021-06-28'
+    assert series_by_id(weeks)[1]['counts'][:3] == [2, 1, 1]
+
+    months = client.get(f'{URL}?interval=month&airline=1').get_json()
+    assert months['buckets'] == ['2021-05-01', '2021-06-01', '2021-07-01']
+    assert series_by_id(months)[1]['counts'] == [4, 0, 1]
+
+
+def test_downsampling_keeps_totals(client):
+    full = client.get(f'{URL}?from=2021-01-01&to=2021-06-30').get_json()
+    reduced = client.get(f'{URL}?from=2021-01-01&to=2021-06-30&max_points=7').get_json()
+    assert len(full['buckets']) == 181 and len(reduced['buckets']) == 7
+    assert reduced['bucket_span'] == 26 and reduced['buckets'][1] == '2021-01-27'
+    assert reduced['total'] == full['total'] == 9
+    for group_id, series in series_by_id(full).items():
+        reduced_series = series_by_id(reduced)[group_id]
+        assert sum(reduced_series['counts']) == sum(series['counts']) == reduced_series['total']
+
+
+def test_empty_result_and_calendar_edges(client):
+    db.session.query(Flight).delete()
+    db.session.commit()
+    response = client.get(f'{URL}?from=2000-01-01&to=2024-01-01&max_points=5')
+    assert response.status_code == 200
+    assert response.get_json()['series'] == [] and len(response.get_json()['buckets']) == 5
+
+    for query in ('from=9999-12-30&to=9999-12-31', 'interval=week&from=9999-12-20&to=9999-12-31',
+                  'interval=month&from=9999-11-15&to=9999-12-31'):
+        response = client.get(f'{URL}?{query}')
+        assert response.status_code == 200, query
+    assert client.get(f'{URL}?interval=month&from=9999-11-15&to=9999-12-31').get_json()['buckets'] == \
+        ['9999-11-01', '9999-12-01']
+
+
+def test_invalid_parameters(client):
+    for query in ('max_points=²', 'max_points=0', 'airline=²', 'airport=x', 'from=2021-05-04&to=2021-05-01',
+                  'from=1900-01-01&to=2100-12-31', 'interval=year'):
+        response = client.get(f'{URL}?{query}')
+        assert response.status_code == 400, query
+        assert response.get_json()['status'] == 'error'
+    # El tope cuenta cubetas del intervalo pedido: el mismo rango en meses se acepta
+    assert client.get(f'{URL}?interval=month&from=1900-01-01&to=2100-12-31').status_code == 200